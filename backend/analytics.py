@@ -0,0 +1,442 @@
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import DateTime, and_, cast, func, literal, null, select, true, tuple_, union_all
+from sqlalchemy.dialects.postgresql import INTERVAL
+from sqlalchemy.orm import Session
+
+from models import Transaction, TransactionRollup
+from sql_utils import is_postgresql, month_key
+
+BUCKET_STEPS = {
+    "day": relativedelta(days=1),
+    "week": relativedelta(weeks=1),
+    "month": relativedelta(months=1),
+    "year": relativedelta(years=1),
+}
+
+# Longest series a bucketed endpoint returns (about ten years of days)
+MAX_BUCKETS = 3700
+
+# Moving-average windows, in days, returned by /transactions/trends
+TREND_WINDOWS = (7, 30, 90)
+
+# Dimensions /transactions/aggregate can group by; "date" is bucketed by the `bucket` parameter
+AGGREGATE_DIMENSIONS = ("type", "category", "payment_method", "location", "tag", "date")
+AGGREGATE_MEASURES = {
+    "sum": func.sum,
+    "count": func.count,
+    "avg": func.avg,
+    "min": func.min,
+    "max": func.max,
+}
+# Most rows one aggregate query returns
+MAX_AGGREGATE_ROWS = 5000
+
+# Computed payloads cached per user and data version (in production, use Redis).
+# Any write bumps the version, so an entry is never served stale; superseded
+# versions are simply replaced.
+VERSION_CACHE_MAX_USERS = 1024
+VERSION_CACHE_MAX_ENTRIES_PER_USER = 16
+_version_cache: Dict[int, Tuple[int, Dict[str, Any]]] = {}
+# Sync endpoints run in a threadpool; guards _version_cache
+_version_cache_lock = threading.Lock()
+
+
+def truncate(value: datetime, bucket: str) -> date:
+    """Start of the bucket containing `value`; weeks start on Monday, as date_trunc('week')."""
+    day = value.date() if isinstance(value, datetime) else value
+    if bucket == "week":
+        return day - relativedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    if bucket == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def bucket_starts(start: datetime, end: datetime, bucket: str) -> List[date]:
+    """Every bucket start from the bucket containing `start` to the one containing `end`."""
+    first, last = truncate(start, bucket), truncate(end, bucket)
+    step = BUCKET_STEPS[bucket]
+    starts = []
+    n = 0
+    while first + step * n <= last:
+        starts.append(first + step * n)
+        n += 1
+    return starts
+
+
+def bucket_count(start: datetime, end: datetime, bucket: str) -> int:
+    """len(bucket_starts(...)) without building the list."""
+    first, last = truncate(start, bucket), truncate(end, bucket)
+    if bucket == "day":
+        return (last - first).days + 1
+    if bucket == "week":
+        return (last - first).days // 7 + 1
+    if bucket == "month":
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return last.year - first.year + 1
+
+
+def bucket_key(db: Session, column, bucket: str):
+    """Bucket start of a datetime column, computed in SQL (date_trunc on PostgreSQL)."""
+    if is_postgresql(db):
+        return func.date_trunc(bucket, column)
+    if bucket == "week":
+        # 'weekday 0' moves to the next Sunday (or stays on one); six days back is Monday
+        return func.date(column, "weekday 0", "-6 days")
+    if bucket == "month":
+        return func.strftime("%Y-%m-01", column)
+    if bucket == "year":
+        return func.strftime("%Y-01-01", column)
+    return func.date(column)
+
+
+def bucket_series(db: Session, start: datetime, end: datetime, bucket: str):
+    """
+    Every bucket start between `start` and `end` as a one-column subquery (`bucket`),
+    with values that compare equal to bucket_key(). Outer-join aggregates onto it so
+    empty buckets appear.
+    """
+    first, last = truncate(start, bucket), truncate(end, bucket)
+    if is_postgresql(db):
+        return select(
+            func.generate_series(
+                literal(datetime.combine(first, datetime.min.time()), DateTime),
+                literal(datetime.combine(last, datetime.min.time()), DateTime),
+                cast(literal(f"1 {bucket}"), INTERVAL)
+            ).label("bucket")
+        ).subquery()
+
+    # SQLite has no generate_series; count the buckets up with a recursive CTE
+    modifier = {"day": "+1 day", "week": "+7 days", "month": "+1 month", "year": "+1 year"}[bucket]
+    series = select(literal(first.isoformat()).label("bucket")).cte("bucket_series", recursive=True)
+    series = series.union_all(
+        select(func.date(series.c.bucket, modifier)).where(series.c.bucket < last.isoformat())
+    )
+    return select(series.c.bucket).subquery()
+
+
+def as_bucket_date(value) -> date:
+    """A bucket value as returned by the database ('YYYY', 'YYYY-MM', 'YYYY-MM-DD', date or datetime)."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    parts = [int(part) for part in value.split("-")] + [1, 1]
+    return date(parts[0], parts[1], parts[2])
+
+
+def columnar_series(buckets: List[date], rows: Iterable) -> List[dict]:
+    """
+    Columnar series from aggregated (bucket, key, type, amount, count) rows: one entry
+    per key with income, expenses and count arrays aligned with `buckets`. Rows with
+    a NULL type (empty buckets from an outer join) only mark their bucket.
+    """
+    index = {bucket: i for i, bucket in enumerate(buckets)}
+    series: Dict[Optional[str], dict] = {}
+    for bucket, key, type_, amount, count in rows:
+        if type_ is None:
+            continue
+        entry = series.get(key)
+        if entry is None:
+            entry = series[key] = {
+                "key": key,
+                "income": [0.0] * len(buckets),
+                "expenses": [0.0] * len(buckets),
+                "count": [0] * len(buckets),
+            }
+        i = index[as_bucket_date(bucket)]
+        entry["income" if type_ == "income" else "expenses"][i] += amount or 0.0
+        entry["count"][i] += count
+
+    for entry in series.values():
+        entry["income"] = [round(amount, 2) for amount in entry["income"]]
+        entry["expenses"] = [round(amount, 2) for amount in entry["expenses"]]
+    return sorted(series.values(), key=lambda entry: (entry["key"] is None, entry["key"] or ""))
+
+
+def _percent_change(delta: Optional[float], base: Optional[float]) -> Optional[float]:
+    if delta is None or not base:
+        return None
+    return round(delta / base * 100, 2)
+
+
+def moving_averages(db: Session, user_id: int, type_: str, end: date, days: int) -> dict:
+    """
+    Daily totals for the `days` days up to `end`, with their TREND_WINDOWS moving
+    averages. Daily totals are outer-joined onto a day series, so the window frames
+    (AVG over the N preceding rows) count days without transactions as zero.
+    """
+    first_shown = end - timedelta(days=days - 1)
+    first = first_shown - timedelta(days=max(TREND_WINDOWS) - 1)
+
+    day = bucket_key(db, Transaction.date, "day")
+    daily = select(
+        day.label("bucket"),
+        func.sum(Transaction.amount).label("total")
+    ).where(
+        and_(
+            Transaction.user_id == user_id,
+            Transaction.type == type_,
+            Transaction.date >= datetime.combine(first, datetime.min.time()),
+            Transaction.date < datetime.combine(end + timedelta(days=1), datetime.min.time())
+        )
+    ).group_by(day).subquery()
+
+    series = bucket_series(db, first, end, "day")
+    total = func.coalesce(daily.c.total, 0.0)
+    averages = [
+        func.avg(total).over(order_by=series.c.bucket, rows=(-(window - 1), 0))
+        for window in TREND_WINDOWS
+    ]
+    rows = db.execute(
+        select(total, *averages)
+        .select_from(series.outerjoin(daily, daily.c.bucket == series.c.bucket))
+        .order_by(series.c.bucket)
+    ).all()[-days:]
+
+    return {
+        "start_date": first_shown.isoformat(),
+        "daily_totals": [round(row[0], 2) for row in rows],
+        "moving_averages": {
+            str(window): [round(row[i + 1], 2) for row in rows]
+            for i, window in enumerate(TREND_WINDOWS)
+        },
+    }
+
+
+def period_deltas(db: Session, user_id: int, type_: str, end: date, months: int) -> dict:
+    """
+    Monthly totals per category for the `months` months up to the month of `end`, with
+    month-over-month and year-over-year deltas from LAG(1) and LAG(12) window functions.
+    Totals come from the monthly rollups; every category gets a row for every month so
+    the lags line up.
+    """
+    last = truncate(end, "month")
+    first_shown = last - relativedelta(months=months - 1)
+    first = first_shown - relativedelta(months=12)
+
+    in_range = and_(
+        TransactionRollup.user_id == user_id,
+        TransactionRollup.type == type_,
+        TransactionRollup.month >= first.strftime("%Y-%m"),
+        TransactionRollup.month <= last.strftime("%Y-%m")
+    )
+    categories = select(TransactionRollup.category.label("category")).distinct().where(in_range).subquery()
+    totals = select(
+        TransactionRollup.month,
+        TransactionRollup.category,
+        TransactionRollup.total_amount
+    ).where(in_range).subquery()
+
+    series = bucket_series(db, first, last, "month")
+    month = month_key(db, series.c.bucket)
+    total = func.coalesce(totals.c.total_amount, 0.0)
+    window = {"partition_by": categories.c.category, "order_by": series.c.bucket}
+    previous_month = func.lag(total, 1).over(**window)
+    previous_year = func.lag(total, 12).over(**window)
+    rows = db.execute(
+        select(
+            categories.c.category,
+            total,
+            total - previous_month,
+            previous_month,
+            total - previous_year,
+            previous_year
+        )
+        .select_from(
+            series.join(categories, true()).outerjoin(
+                totals,
+                and_(totals.c.month == month, totals.c.category == categories.c.category)
+            )
+        )
+        .order_by(categories.c.category, series.c.bucket)
+    ).all()
+
+    by_category: Dict[str, List] = {}
+    for row in rows:
+        by_category.setdefault(row[0], []).append(row)
+
+    result = []
+    for category, category_rows in by_category.items():
+        shown = category_rows[-months:]
+        result.append({
+            "category": category,
+            "totals": [round(row[1], 2) for row in shown],
+            "mom_delta": [round(row[2], 2) for row in shown],
+            "mom_pct": [_percent_change(row[2], row[3]) for row in shown],
+            "yoy_delta": [round(row[4], 2) for row in shown],
+            "yoy_pct": [_percent_change(row[4], row[5]) for row in shown],
+        })
+
+    return {
+        "months": [start.strftime("%Y-%m") for start in bucket_starts(first_shown, last, "month")],
+        "categories": result,
+    }
+
+
+def grouping_sets(dimensions: List[str], totals: str) -> List[Tuple[str, ...]]:
+    """
+    The grouping sets for `dimensions`: just the full set ("none"), its prefixes down
+    to the grand total ("rollup", as ROLLUP) or every subset ("cube", as CUBE). The
+    tag dimension stays in every set, because a transaction with several tags is
+    counted once per tag and totals across tags would overcount.
+    """
+    keep = tuple(dimension for dimension in dimensions if dimension == "tag")
+    varying = [dimension for dimension in dimensions if dimension != "tag"]
+    if totals == "rollup":
+        subsets = [varying[:n] for n in range(len(varying), -1, -1)]
+    elif totals == "cube":
+        subsets = [
+            [dimension for i, dimension in enumerate(varying) if mask & (1 << (len(varying) - 1 - i))]
+            for mask in range(2 ** len(varying) - 1, -1, -1)
+        ]
+    else:
+        subsets = [varying]
+    return [tuple(dimension for dimension in dimensions if dimension in subset or dimension in keep) for subset in subsets]
+
+
+def _aggregate_source(db: Session, dimensions: List[str], bucket: str):
+    """FROM clause and dimension columns for aggregate(); tags are unnested one row per tag."""
+    source = Transaction.__table__
+    columns = {
+        "type": Transaction.type,
+        "category": Transaction.category,
+        "payment_method": Transaction.payment_method,
+        "location": Transaction.location,
+        "date": bucket_key(db, Transaction.date, bucket),
+    }
+    if "tag" in dimensions:
+        # Untagged transactions are kept, with a NULL tag
+        if is_postgresql(db):
+            tags = func.jsonb_array_elements_text(Transaction.tags).table_valued("value").lateral()
+        else:
+            tags = func.json_each(Transaction.tags).table_valued("value")
+        source = source.outerjoin(tags, true())
+        columns["tag"] = tags.c.value
+    return source, [columns[dimension] for dimension in dimensions]
+
+
+def aggregate(
+    db: Session,
+    user_id: int,
+    dimensions: List[str],
+    measures: List[str],
+    totals: str = "none",
+    bucket: str = "month",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> dict:
+    """
+    Measures of transaction amounts grouped by `dimensions`, with subtotals per
+    grouping_sets(), in one statement: GROUP BY GROUPING SETS on PostgreSQL and a
+    UNION ALL of one GROUP BY per set on SQLite. Each row names the dimensions it is
+    grouped by; the others are totals. At most MAX_AGGREGATE_ROWS rows are returned.
+    """
+    source, columns = _aggregate_source(db, dimensions, bucket)
+    scope = [Transaction.user_id == user_id]
+    if start:
+        scope.append(Transaction.date >= start)
+    if end:
+        scope.append(Transaction.date <= end)
+
+    values = [
+        AGGREGATE_MEASURES[measure](Transaction.id if measure == "count" else Transaction.amount).label(measure)
+        for measure in measures
+    ]
+    sets = grouping_sets(dimensions, totals)
+    keys = [f"d{i}" for i in range(len(dimensions))]
+
+    if is_postgresql(db):
+        # GROUPING() has a bit set, most significant first, for each dimension a row totals over
+        grouped = func.grouping(*columns) if columns else literal(0)
+        query = select(
+            *[column.label(key) for column, key in zip(columns, keys)],
+            grouped.label("grouping_id"),
+            *values
+        ).select_from(source).where(*scope)
+        if columns:
+            by_name = dict(zip(dimensions, columns))
+            query = query.group_by(func.grouping_sets(*[
+                tuple_(*[by_name[dimension] for dimension in grouping_set]) for grouping_set in sets
+            ]))
+    else:
+        # SQLite has no GROUPING SETS; run one GROUP BY per set in a single compound statement
+        parts = []
+        for grouping_set in sets:
+            mask = sum(1 << (len(dimensions) - 1 - i) for i, dimension in enumerate(dimensions) if dimension not in grouping_set)
+            group = [column for column, dimension in zip(columns, dimensions) if dimension in grouping_set]
+            parts.append(
+                select(
+                    *[
+                        (column if dimension in grouping_set else null()).label(key)
+                        for column, dimension, key in zip(columns, dimensions, keys)
+                    ],
+                    literal(mask).label("grouping_id"),
+                    *values
+                ).select_from(source).where(*scope).group_by(*group)
+            )
+        query = union_all(*parts).subquery()
+        query = select(query)
+
+    ordering = [query.selected_columns.grouping_id] + [query.selected_columns[key] for key in keys]
+    rows = db.execute(query.order_by(*ordering).limit(MAX_AGGREGATE_ROWS + 1)).all()
+
+    result = []
+    for row in rows[:MAX_AGGREGATE_ROWS]:
+        mask = row.grouping_id
+        group = {}
+        for i, (dimension, key) in enumerate(zip(dimensions, keys)):
+            if mask & (1 << (len(dimensions) - 1 - i)):
+                continue
+            value = getattr(row, key)
+            if dimension == "date" and value is not None:
+                value = as_bucket_date(value).isoformat()
+            group[dimension] = value
+        result.append({
+            "group": group,
+            **{
+                measure: getattr(row, measure) if measure == "count" else round(getattr(row, measure) or 0.0, 2)
+                for measure in measures
+            }
+        })
+
+    return {
+        "dimensions": dimensions,
+        "measures": measures,
+        "totals": totals,
+        "bucket": bucket if "date" in dimensions else None,
+        "rows": result,
+        "truncated": len(rows) > MAX_AGGREGATE_ROWS,
+    }
+
+
+def cached_for_version(user_id: int, data_version: int, key: str, compute: Callable[[], Any]) -> Any:
+    """The value computed for `key` at the user's data version, computing it on a miss."""
+    with _version_cache_lock:
+        version, entries = _version_cache.get(user_id, (None, None))
+        if version == data_version and key in entries:
+            return entries[key]
+
+    # Compute outside the lock; concurrent misses may both compute, which is harmless
+    value = compute()
+    with _version_cache_lock:
+        version, entries = _version_cache.get(user_id, (None, None))
+        if version is not None and version > data_version:
+            # A newer version was cached while this one was computing
+            return value
+        if version != data_version:
+            if user_id not in _version_cache and len(_version_cache) >= VERSION_CACHE_MAX_USERS:
+                # Evict the least recently written user
+                _version_cache.pop(next(iter(_version_cache)), None)
+            entries = {}
+            _version_cache.pop(user_id, None)
+            _version_cache[user_id] = (data_version, entries)
+        if len(entries) >= VERSION_CACHE_MAX_ENTRIES_PER_USER:
+            entries.pop(next(iter(entries)), None)
+        entries[key] = value
+    return value
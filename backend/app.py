@@ -11,7 +11,8 @@ from routers import (
     auth_router, # Import your routers
     categories,
     budgets,
-    currency
+    currency,
+    sync
 )
 
 load_dotenv()
@@ -35,6 +36,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 @app.middleware("http")
@@ -50,6 +52,7 @@ app.include_router(transactions.router, tags=["Transactions"])
 app.include_router(categories.router, tags=["Categories"])
 app.include_router(budgets.router, tags=["Budgets"])
 app.include_router(currency.router, tags=["Currency"])
+app.include_router(sync.router, tags=["Sync"])
 
 if __name__ == "__main__":
     import uvicorn
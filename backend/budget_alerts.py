@@ -0,0 +1,115 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from models import Budget, BudgetAlert, BudgetSpend
+from sql_utils import id_in, is_postgresql
+
+
+def _percentage_used():
+    """Budget usage in percent, computed in SQL as calculate_budget_usages() does."""
+    return case((Budget.amount > 0, BudgetSpend.spent * 100.0 / Budget.amount), else_=0.0)
+
+
+def evaluate_budget_alerts(
+    db: Session,
+    user_ids: List[int],
+    budget_ids: Optional[List[int]] = None
+) -> Tuple[int, int]:
+    """
+    Record threshold crossings of the users' active budgets (or only of
+    `budget_ids`) in budget_alerts, in the caller's transaction, with one
+    INSERT ... SELECT and one UPDATE:
+
+    - A budget at or over its alert_threshold gets an open alert for its current
+      window and threshold. An existing alert is updated instead of duplicated,
+      and reopened if it had been resolved.
+    - Open alerts whose budget is inactive or back under the threshold are resolved.
+
+    Spend comes from the budget_spend ledger, and budgets without a ledger row
+    are skipped. The ledger calls this for the budgets whose spend it changes;
+    budget updates call it when the amount, threshold or active flag changes.
+    Returns (alerts opened or updated, alerts resolved).
+    """
+    if not user_ids or budget_ids == []:
+        return 0, 0
+
+    in_scope = [id_in(db, Budget.user_id, user_ids)]
+    alerts_in_scope = [id_in(db, BudgetAlert.user_id, user_ids)]
+    if budget_ids is not None:
+        in_scope.append(id_in(db, Budget.id, budget_ids))
+        alerts_in_scope.append(id_in(db, BudgetAlert.budget_id, budget_ids))
+
+    percentage_used = _percentage_used()
+    crossing = and_(
+        *in_scope,
+        Budget.is_active == True,
+        percentage_used >= Budget.alert_threshold
+    )
+    crossings = select(
+        Budget.user_id,
+        Budget.id,
+        BudgetSpend.window_start,
+        BudgetSpend.window_end,
+        Budget.alert_threshold,
+        Budget.amount,
+        BudgetSpend.spent,
+        percentage_used
+    ).join(BudgetSpend, BudgetSpend.budget_id == Budget.id).where(crossing)
+
+    if is_postgresql(db):
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+
+    stmt = upsert(BudgetAlert).from_select(
+        [
+            "user_id", "budget_id", "window_start", "window_end", "threshold",
+            "budget_amount", "spent", "percentage_used"
+        ],
+        crossings
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["budget_id", "window_start", "threshold"],
+        set_={
+            "window_end": stmt.excluded.window_end,
+            "budget_amount": stmt.excluded.budget_amount,
+            "spent": stmt.excluded.spent,
+            "percentage_used": stmt.excluded.percentage_used,
+            "resolved_at": None,
+            "updated_at": func.now(),
+        },
+        # Leave alerts that have not changed since the last run alone
+        where=or_(
+            BudgetAlert.resolved_at.isnot(None),
+            BudgetAlert.spent != stmt.excluded.spent,
+            BudgetAlert.budget_amount != stmt.excluded.budget_amount,
+            BudgetAlert.window_end != stmt.excluded.window_end
+        )
+    )
+    opened = db.execute(stmt).rowcount
+
+    still_crossing = select(Budget.id).join(
+        BudgetSpend, BudgetSpend.budget_id == Budget.id
+    ).where(
+        and_(
+            crossing,
+            Budget.id == BudgetAlert.budget_id,
+            Budget.alert_threshold == BudgetAlert.threshold,
+            BudgetSpend.window_start == BudgetAlert.window_start
+        )
+    )
+    resolved = db.execute(
+        update(BudgetAlert)
+        .where(
+            and_(
+                *alerts_in_scope,
+                BudgetAlert.resolved_at.is_(None),
+                ~still_crossing.exists()
+            )
+        )
+        .values(resolved_at=func.now())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return opened, resolved
@@ -0,0 +1,428 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import DateTime, Integer, and_, case, cast, column, delete, exists, func, literal, or_, select, union_all, update, values
+from sqlalchemy.dialects.postgresql import INTERVAL
+from sqlalchemy.orm import Session, joinedload
+
+from models import Budget, BudgetSpend, Transaction
+from budget_alerts import evaluate_budget_alerts
+from sql_utils import id_in, is_postgresql
+
+# (date, category_id) of expense transactions -> (amount delta, count delta)
+SpendDeltas = Dict[Tuple[datetime, Optional[int]], Tuple[float, int]]
+
+# Length of each budget period, as laid out by calculate_budget_period_dates()
+PERIOD_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+# Most periods one history request returns (ten years of months)
+MAX_HISTORY_PERIODS = 120
+
+
+def calculate_budget_period_dates(period: str, reference_date: datetime = None):
+    """Calculate start and end dates for a budget period"""
+    if reference_date is None:
+        reference_date = datetime.utcnow()
+
+    if period == "monthly":
+        start_date = reference_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        end_date = (start_date + relativedelta(months=1)) - timedelta(seconds=1)
+    elif period == "quarterly":
+        quarter = (reference_date.month - 1) // 3
+        start_date = datetime(reference_date.year, quarter * 3 + 1, 1)
+        end_date = (start_date + relativedelta(months=3)) - timedelta(seconds=1)
+    elif period == "yearly":
+        start_date = reference_date.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        end_date = reference_date.replace(month=12, day=31, hour=23, minute=59, second=59, microsecond=999999)
+    else:
+        raise ValueError(f"Invalid period: {period}")
+
+    return start_date, end_date
+
+
+def budget_window(budget: Budget) -> Tuple[datetime, datetime]:
+    """Start and end of the window a budget's spending is counted over"""
+    # Use the budget's actual start and end dates
+    start_date = budget.start_date
+
+    # If budget has an end_date, use it; otherwise calculate based on period
+    if budget.end_date:
+        end_date = budget.end_date
+    else:
+        # Calculate end date based on period from start_date
+        if budget.period == "monthly":
+            end_date = start_date + relativedelta(months=1) - timedelta(seconds=1)
+        elif budget.period == "quarterly":
+            end_date = start_date + relativedelta(months=3) - timedelta(seconds=1)
+        elif budget.period == "yearly":
+            end_date = start_date + relativedelta(years=1) - timedelta(seconds=1)
+        else:
+            # Default to one month if period is unknown
+            end_date = start_date + relativedelta(months=1) - timedelta(seconds=1)
+
+    return start_date, end_date
+
+
+def spend_window(budget: Budget) -> tuple:
+    """(budget_id, user_id, category_id, start_date, end_date) of a budget"""
+    start_date, end_date = budget_window(budget)
+    return (budget.id, budget.user_id, budget.category_id or None, start_date, end_date)
+
+
+def _windows_table(db: Session, windows: list):
+    """spend_window() rows as a FROM clause"""
+    columns = [
+        column("budget_id", Integer),
+        column("user_id", Integer),
+        column("category_id", Integer),
+        column("start_date", DateTime),
+        column("end_date", DateTime)
+    ]
+    if is_postgresql(db):
+        rows = values(*columns, name="window_values").data(windows)
+        # A column that is NULL in every row would otherwise be typed as text
+        return select(*[cast(rows.c[col.name], col.type).label(col.name) for col in columns]).subquery("budget_windows")
+
+    # SQLite cannot name the columns of a VALUES list; select the literals instead
+    return union_all(*[
+        select(*[literal(value, col.type).label(col.name) for value, col in zip(window, columns)])
+        for window in windows
+    ]).subquery("budget_windows")
+
+
+def spent_by_budget(db: Session, windows: list) -> Dict[int, Tuple[float, int]]:
+    """
+    Expense (total, count) for each spend_window() in one grouped query. Matches
+    transactions by category_id, as the ledger does, so it is served by
+    ix_transactions_user_id_category_id_type_date.
+    """
+    if not windows:
+        return {}
+
+    w = _windows_table(db, windows)
+    rows = db.execute(
+        select(w.c.budget_id, func.sum(Transaction.amount), func.count(Transaction.id)).select_from(w).join(
+            Transaction,
+            and_(
+                Transaction.user_id == w.c.user_id,
+                Transaction.type == 'expense',
+                Transaction.date >= w.c.start_date,
+                Transaction.date <= w.c.end_date,
+                or_(w.c.category_id == None, Transaction.category_id == w.c.category_id)
+            )
+        ).group_by(w.c.budget_id)
+    ).all()
+    return {budget_id: (spent or 0.0, n) for budget_id, spent, n in rows}
+
+
+def add_spend_delta(
+    deltas: SpendDeltas,
+    date: datetime,
+    type: str,
+    category_id: Optional[int],
+    amount: float,
+    count: int = 1
+):
+    """Accumulate the effect of adding (count=1) or removing (count=-1) one transaction; income is ignored."""
+    if type != "expense":
+        return
+    if date.tzinfo is not None:
+        # Stored dates are naive UTC
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    key = (date, category_id)
+    total, n = deltas.get(key, (0.0, 0))
+    deltas[key] = (total + amount * count, n + count)
+
+
+def add_spend_rows(deltas: SpendDeltas, rows: Iterable, sign: int = 1):
+    """Accumulate spend_totals() rows, added (sign=1) or removed (sign=-1)."""
+    for date, category_id, amount, count in rows:
+        key = (date, category_id)
+        total, n = deltas.get(key, (0.0, 0))
+        deltas[key] = (total + amount * sign, n + count * sign)
+
+
+def spend_totals(db: Session, condition) -> list:
+    """
+    (date, category_id, total_amount, transaction_count) of the expense
+    transactions matching `condition`, for set-based writes.
+    """
+    return db.execute(
+        select(
+            Transaction.date,
+            Transaction.category_id,
+            func.sum(Transaction.amount),
+            func.count(Transaction.id)
+        )
+        .where(and_(condition, Transaction.type == 'expense'))
+        .group_by(Transaction.date, Transaction.category_id)
+    ).all()
+
+
+def apply_spend_deltas(db: Session, user_id: int, deltas: SpendDeltas):
+    """
+    Add accumulated deltas to the spend of every budget of the user whose window
+    and category they fall in, in the caller's transaction.
+    """
+    apply_user_spend_deltas(db, {user_id: deltas})
+
+
+def apply_user_spend_deltas(db: Session, deltas_by_user: Dict[int, SpendDeltas]):
+    """
+    apply_spend_deltas for several users at once. The users' spend rows that
+    overlap the deltas are read in one query and updated in one UPDATE, and the
+    alerts of the budgets that changed are re-evaluated.
+    """
+    deltas_by_user = {
+        user_id: deltas for user_id, deltas in deltas_by_user.items()
+        if user_id is not None and any(amount or count for amount, count in deltas.values())
+    }
+    if not deltas_by_user:
+        return
+
+    dates = [date for deltas in deltas_by_user.values() for date, _ in deltas]
+    ledgers = db.execute(
+        select(
+            BudgetSpend.budget_id,
+            BudgetSpend.user_id,
+            BudgetSpend.category_id,
+            BudgetSpend.window_start,
+            BudgetSpend.window_end
+        ).where(
+            and_(
+                id_in(db, BudgetSpend.user_id, deltas_by_user),
+                BudgetSpend.window_start <= max(dates),
+                BudgetSpend.window_end >= min(dates)
+            )
+        )
+    ).all()
+
+    amounts: Dict[int, float] = {}
+    counts: Dict[int, int] = {}
+    changed_users = set()
+    for ledger in ledgers:
+        for (date, category_id), (amount, count) in deltas_by_user[ledger.user_id].items():
+            if not ledger.window_start <= date <= ledger.window_end:
+                continue
+            if ledger.category_id is not None and ledger.category_id != category_id:
+                continue
+            amounts[ledger.budget_id] = amounts.get(ledger.budget_id, 0.0) + amount
+            counts[ledger.budget_id] = counts.get(ledger.budget_id, 0) + count
+            changed_users.add(ledger.user_id)
+    if not amounts:
+        return
+
+    db.execute(
+        update(BudgetSpend)
+        .where(id_in(db, BudgetSpend.budget_id, amounts))
+        .values(
+            spent=BudgetSpend.spent + case(amounts, value=BudgetSpend.budget_id),
+            transaction_count=BudgetSpend.transaction_count + case(counts, value=BudgetSpend.budget_id),
+            updated_at=func.now()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    evaluate_budget_alerts(db, sorted(changed_users), list(amounts))
+
+
+def record_spend(db: Session, transaction: Transaction, count: int = 1):
+    """Add (count=1) or remove (count=-1) a single transaction from its user's budget spend."""
+    if transaction.user_id is None:
+        return
+    deltas: SpendDeltas = {}
+    add_spend_delta(deltas, transaction.date, transaction.type, transaction.category_id, transaction.amount, count)
+    apply_spend_deltas(db, transaction.user_id, deltas)
+
+
+def refresh_budget_spend(db: Session, budgets: List[Budget]):
+    """
+    Recompute the spend rows of `budgets` from raw transactions, with one DELETE,
+    one grouped query and one INSERT, in the caller's transaction, and
+    re-evaluate their alerts. Call after a budget is created or its window or
+    category changes.
+    """
+    if not budgets:
+        return
+    windows = [spend_window(budget) for budget in budgets]
+    spent = spent_by_budget(db, windows)
+
+    db.execute(delete(BudgetSpend).where(id_in(db, BudgetSpend.budget_id, [budget.id for budget in budgets])))
+    db.execute(
+        BudgetSpend.__table__.insert(),
+        [
+            {
+                "budget_id": budget_id,
+                "user_id": user_id,
+                "category_id": category_id,
+                "window_start": start_date,
+                "window_end": end_date,
+                "spent": spent.get(budget_id, (0.0, 0))[0],
+                "transaction_count": spent.get(budget_id, (0.0, 0))[1],
+            }
+            for budget_id, user_id, category_id, start_date, end_date in windows
+        ]
+    )
+    evaluate_budget_alerts(
+        db,
+        sorted({user_id for _, user_id, _, _, _ in windows}),
+        [budget_id for budget_id, _, _, _, _ in windows]
+    )
+    # Loaded budgets would otherwise keep their stale spend relationship
+    for budget in budgets:
+        if "spend" in budget.__dict__:
+            db.expire(budget, ["spend"])
+
+
+def fill_missing_spend(db: Session, user_ids: List[int]) -> int:
+    """Create spend ledger rows for the users' active budgets that have none. Returns how many."""
+    missing = db.query(Budget).filter(
+        and_(
+            id_in(db, Budget.user_id, user_ids),
+            Budget.is_active == True,
+            ~exists().where(BudgetSpend.budget_id == Budget.id)
+        )
+    ).options(joinedload(Budget.category)).all()
+    refresh_budget_spend(db, missing)
+    return len(missing)
+
+
+def user_budgets(db: Session, user_ids: List[int]) -> List[Budget]:
+    """All budgets of the given users, with their category and spend row loaded."""
+    return db.query(Budget).filter(id_in(db, Budget.user_id, user_ids)).options(
+        joinedload(Budget.category),
+        joinedload(Budget.spend)
+    ).order_by(Budget.id).all()
+
+
+def refresh_user_budget_spend(db: Session, user_ids: List[int]):
+    """refresh_budget_spend for every budget of the given users (e.g. after their amounts are converted)."""
+    if user_ids:
+        refresh_budget_spend(db, user_budgets(db, user_ids))
+
+
+def find_spend_drift(db: Session, user_ids: List[int], tolerance: float = 0.005) -> List[dict]:
+    """Compare stored budget spend with raw transactions and list every budget that differs."""
+    budgets = user_budgets(db, user_ids)
+    windows = [spend_window(budget) for budget in budgets]
+    expected = spent_by_budget(db, windows)
+
+    drift = []
+    for budget, window in zip(budgets, windows):
+        expected_amount, expected_count = expected.get(budget.id, (0.0, 0))
+        ledger = budget.spend
+        stale_window = ledger is None or (
+            ledger.category_id, ledger.window_start, ledger.window_end
+        ) != window[2:]
+        stored_amount = ledger.spent if ledger else 0.0
+        stored_count = ledger.transaction_count if ledger else 0
+        if stale_window or expected_count != stored_count or abs(expected_amount - stored_amount) > tolerance:
+            drift.append({
+                "user_id": budget.user_id,
+                "budget_id": budget.id,
+                "missing": ledger is None,
+                "expected_amount": expected_amount,
+                "stored_amount": stored_amount,
+                "expected_count": expected_count,
+                "stored_count": stored_count,
+            })
+    return drift
+
+
+def _period_series(db: Session, period: str, first: datetime, last: datetime):
+    """
+    Start of every `period` window from `first` to `last` (both window starts),
+    with the start of the window after it: (period, period_start, next_start).
+    """
+    months = PERIOD_MONTHS[period]
+    if is_postgresql(db):
+        step = cast(literal(f"{months} months"), INTERVAL)
+        starts = select(
+            func.generate_series(literal(first, DateTime), literal(last, DateTime), step).label("period_start")
+        ).subquery()
+        return select(
+            literal(period).label("period"),
+            starts.c.period_start,
+            (starts.c.period_start + step).label("next_start")
+        )
+
+    # SQLite has no generate_series; count the windows up with a recursive CTE
+    modifier = f"+{months} months"
+    series = select(literal(first.date().isoformat()).label("period_start")).cte(f"{period}_periods", recursive=True)
+    series = series.union_all(
+        select(func.date(series.c.period_start, modifier)).where(series.c.period_start < last.date().isoformat())
+    )
+    return select(
+        literal(period).label("period"),
+        series.c.period_start,
+        func.date(series.c.period_start, modifier).label("next_start")
+    )
+
+
+def budget_history(db: Session, budgets: List[Budget], periods: int, now: Optional[datetime] = None) -> Dict[int, List[dict]]:
+    """
+    Spending of each budget in its last `periods` calendar periods (as laid out by
+    calculate_budget_period_dates), oldest first, keyed by budget id. Periods
+    before the one containing the budget's start_date or after its end_date are
+    left out. The windows come from generate_series and are joined with
+    transactions by category_id, as the ledger counts them, in one grouped query;
+    windows without spending count as 0.
+    """
+    history: Dict[int, List[dict]] = {budget.id: [] for budget in budgets}
+    now = now or datetime.utcnow()
+    series = []
+    for period in sorted({budget.period for budget in budgets} & PERIOD_MONTHS.keys()):
+        current_start, _ = calculate_budget_period_dates(period, now)
+        first = current_start - relativedelta(months=PERIOD_MONTHS[period] * (periods - 1))
+        series.append(_period_series(db, period, first, current_start))
+    if not series:
+        return history
+
+    w = union_all(*series).subquery("budget_periods")
+    rows = db.execute(
+        select(
+            Budget.id,
+            w.c.period_start,
+            func.coalesce(func.sum(Transaction.amount), 0.0),
+            func.count(Transaction.id)
+        )
+        .select_from(Budget)
+        .join(
+            w,
+            and_(
+                w.c.period == Budget.period,
+                w.c.next_start > Budget.start_date,
+                or_(Budget.end_date == None, w.c.period_start <= Budget.end_date)
+            )
+        )
+        .outerjoin(
+            # Matched by category_id like the ledger, on ix_transactions_user_id_category_id_type_date
+            Transaction,
+            and_(
+                Transaction.user_id == Budget.user_id,
+                Transaction.type == 'expense',
+                Transaction.date >= w.c.period_start,
+                Transaction.date < w.c.next_start,
+                or_(Budget.category_id == None, Transaction.category_id == Budget.category_id)
+            )
+        )
+        .where(id_in(db, Budget.id, list(history)))
+        .group_by(Budget.id, w.c.period_start)
+        .order_by(Budget.id, w.c.period_start)
+    ).all()
+
+    budgets_by_id = {budget.id: budget for budget in budgets}
+    for budget_id, period_start, spent, count in rows:
+        budget = budgets_by_id[budget_id]
+        if not isinstance(period_start, datetime):
+            # SQLite returns the window start as 'YYYY-MM-DD'
+            period_start = datetime.fromisoformat(period_start)
+        start_date, end_date = calculate_budget_period_dates(budget.period, period_start)
+        history[budget_id].append({
+            "period_start": start_date,
+            "period_end": end_date,
+            "spent": spent,
+            "transaction_count": count,
+            "percentage_used": (spent / budget.amount * 100) if budget.amount > 0 else 0.0,
+            "remaining_amount": budget.amount - spent,
+        })
+    return history
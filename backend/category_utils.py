@@ -0,0 +1,100 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from models import Category, Transaction, TransactionRollup
+from rollups import refresh_rollups
+from budget_spend import refresh_user_budget_spend
+
+
+def category_ids(db: Session, user_id: int, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+    """
+    Ids of the user's categories for (name, type) pairs, in one query. Pairs
+    without a matching category are left out; their transactions keep a NULL
+    category_id until such a category is created.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    rows = db.execute(
+        select(Category.name, Category.type, Category.id).where(
+            and_(
+                Category.user_id == user_id,
+                tuple_(Category.name, Category.type).in_(keys)
+            )
+        )
+    )
+    return {(name, type_): id_ for name, type_, id_ in rows}
+
+
+def category_id_for(db: Session, user_id: int, name: str, type_: str) -> Optional[int]:
+    """category_ids() for a single transaction."""
+    return category_ids(db, user_id, [(name, type_)]).get((name, type_))
+
+
+def link_category_ids(db: Session, condition) -> List[int]:
+    """
+    Set category_id on transactions matching `condition` that have none yet, from
+    the category with the same user, name and type, in one UPDATE ... FROM. Used
+    when categories are created and by scripts/backfill_category_ids.py.
+
+    updated_at and sync_seq are left alone: the name clients display is
+    unchanged, so this should not make every linked row look modified to delta sync.
+    Returns the user id of every transaction linked.
+    """
+    return db.scalars(
+        update(Transaction)
+        .where(
+            and_(
+                condition,
+                Transaction.category_id.is_(None),
+                Category.user_id == Transaction.user_id,
+                Category.name == Transaction.category,
+                Category.type == Transaction.type
+            )
+        )
+        .values(category_id=Category.id, updated_at=Transaction.updated_at, sync_seq=Transaction.sync_seq)
+        .returning(Transaction.user_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def rename_category(db: Session, category: Category, old_name: str):
+    """
+    Carry a category rename over to its transactions and to the monthly rollups,
+    which are keyed by name, in the caller's transaction. Transactions still
+    matched only by name (not linked yet) are renamed and linked as well.
+    """
+    db.execute(
+        update(Transaction)
+        .where(
+            and_(
+                Transaction.user_id == category.user_id,
+                or_(
+                    Transaction.category_id == category.id,
+                    and_(
+                        Transaction.category_id.is_(None),
+                        Transaction.category == old_name,
+                        Transaction.type == category.type
+                    )
+                )
+            )
+        )
+        .values(category=category.name, category_id=category.id)
+        .execution_options(synchronize_session=False)
+    )
+
+    # Rebuild only the months that had either name; the new name may already
+    # have rollups from uncategorized transactions
+    months = db.scalars(
+        select(TransactionRollup.month).distinct().where(
+            and_(
+                TransactionRollup.user_id == category.user_id,
+                TransactionRollup.category.in_([old_name, category.name])
+            )
+        )
+    ).all()
+    refresh_rollups(db, [category.user_id], months)
+    # Transactions linked here now count toward the category's budgets
+    refresh_user_budget_spend(db, [category.user_id])
@@ -1,5 +1,6 @@
 import httpx
-from typing import Dict, Optional, Tuple
+import threading
+from typing import Dict, Iterable, Optional, Tuple
 try:
     from ipware import get_client_ip
 except ImportError:
@@ -10,7 +11,7 @@ except ImportError:
             ip = x_forwarded_for.split(',')[0]
             return ip, True
         return request.client.host, True
-from datetime import datetime, timedelta
+from datetime import date as date_type, datetime, timedelta
 import json
 from fastapi import Request
 
@@ -34,6 +35,17 @@ _exchange_rate_cache = {
     "last_updated": None
 }
 
+# Historical rates never change, so they are cached without expiry
+# (from_currency, to_currency, date) -> rate
+# In production, use Redis or similar
+_historical_rate_cache: Dict[Tuple[str, str, date_type], float] = {}
+# Shared by requests served from the threadpool; guards _historical_rate_cache
+_historical_rate_cache_lock = threading.Lock()
+HISTORICAL_RATE_CACHE_MAX_ENTRIES = 50000
+# Extra days fetched before the earliest requested date so that weekends and
+# holidays at the start of a range can fall back to the previous business day
+HISTORICAL_RATE_LOOKBACK_DAYS = 7
+
 async def get_currency_from_ip(request: Request) -> str:
     """
     Detect user's currency based on their IP address.
@@ -138,35 +150,85 @@ async def get_historical_exchange_rate(from_currency: str, to_currency: str, dat
     Get historical exchange rate for a specific date.
     Returns the exchange rate from from_currency to to_currency.
     """
-    # For now, we'll use current rates as a fallback
-    # In production, you'd want to use a historical rates API like:
-    # - exchangerate-api.com historical endpoint (paid)
-    # - frankfurter.app (free)
-    # - currencylayer.com (free tier)
-    
+    rates = await get_historical_exchange_rates(from_currency, to_currency, [date])
+    return rates[date.date() if isinstance(date, datetime) else date]
+
+async def get_historical_exchange_rates(
+    from_currency: str,
+    to_currency: str,
+    dates: Iterable[datetime]
+) -> Dict[date_type, float]:
+    """
+    Get historical exchange rates for many dates at once, keyed by calendar date.
+
+    Distinct dates not already cached are resolved with a single time-series
+    request covering their whole span (frankfurter.app), so the cost grows with
+    the number of distinct days rather than the number of rows. Days without a
+    published rate (weekends, holidays) use the previous business day's rate;
+    anything still unresolved falls back to current rates.
+    """
+    days = {d.date() if isinstance(d, datetime) else d for d in dates}
+    if from_currency == to_currency:
+        return {day: 1.0 for day in days}
+
+    result = {}
+    missing = []
+    with _historical_rate_cache_lock:
+        cached_rates = {day: _historical_rate_cache.get((from_currency, to_currency, day)) for day in days}
+    for day, cached in cached_rates.items():
+        if cached is None:
+            missing.append(day)
+        else:
+            result[day] = cached
+    if not missing:
+        return result
+
+    published = {}
+    start = min(missing) - timedelta(days=HISTORICAL_RATE_LOOKBACK_DAYS)
+    end = max(missing)
     try:
-        # Format date as YYYY-MM-DD
-        date_str = date.strftime("%Y-%m-%d")
-        
-        # Using frankfurter.app (free historical rates API)
         async with httpx.AsyncClient() as client:
             response = await client.get(
-                f"https://api.frankfurter.app/{date_str}",
+                f"https://api.frankfurter.app/{start.isoformat()}..{end.isoformat()}",
                 params={"from": from_currency, "to": to_currency},
-                timeout=10.0
+                timeout=30.0
             )
-            
+
             if response.status_code == 200:
                 data = response.json()
-                rates = data.get("rates", {})
-                return rates.get(to_currency, 1.0)
-    
+                for day_str, rates in data.get("rates", {}).items():
+                    if to_currency in rates:
+                        published[date_type.fromisoformat(day_str)] = rates[to_currency]
+
     except Exception as e:
-        print(f"Error fetching historical rate for {date_str}: {e}")
-    
-    # Fallback to current rates
-    rates = await get_exchange_rates()
-    return convert_currency(1.0, from_currency, to_currency, rates)
+        print(f"Error fetching historical rates for {start}..{end}: {e}")
+
+    fallback_rate = None
+    published_days = sorted(published)
+    index = 0
+    latest_rate = None
+    for day in sorted(missing):
+        # Walk forward to the last business day on or before `day`
+        while index < len(published_days) and published_days[index] <= day:
+            latest_rate = published[published_days[index]]
+            index += 1
+
+        if latest_rate is not None and day <= published_days[-1] + timedelta(days=HISTORICAL_RATE_LOOKBACK_DAYS):
+            rate = latest_rate
+            # Only cache rates that came from the API
+            with _historical_rate_cache_lock:
+                if len(_historical_rate_cache) >= HISTORICAL_RATE_CACHE_MAX_ENTRIES:
+                    _historical_rate_cache.pop(next(iter(_historical_rate_cache)), None)
+                _historical_rate_cache[(from_currency, to_currency, day)] = rate
+        else:
+            # Fallback to current rates
+            if fallback_rate is None:
+                rates = await get_exchange_rates()
+                fallback_rate = convert_currency(1.0, from_currency, to_currency, rates)
+            rate = fallback_rate
+        result[day] = rate
+
+    return result
 
 def calculate_exchange_rate_to_usd(amount: float, currency: str, exchange_rate: float = None) -> float:
     """
@@ -0,0 +1,83 @@
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from auth import get_current_user
+from models import User
+from sql_utils import id_in
+from sync_utils import stamp_sync_seq
+
+
+def bump_data_version(db: Session, user_id: int):
+    """
+    Advance a user's data version in the caller's transaction and stamp the
+    rows it wrote for /sync. Call from every write path that changes what the
+    user's read endpoints return, after its last write.
+    """
+    bump_data_versions(db, [user_id])
+
+
+def bump_data_versions(db: Session, user_ids: Iterable[int]):
+    """bump_data_version for several users at once."""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    # Pending ORM changes must be written before they can be stamped
+    db.flush()
+    db.execute(
+        update(User)
+        .where(id_in(db, User.id, user_ids))
+        .values(data_version=User.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    stamp_sync_seq(db, user_ids)
+
+
+def make_etag(user: User, request: Request, *extra: str) -> str:
+    """Strong ETag for a read of `request` at the user's current data version."""
+    params = sorted(request.query_params.multi_items())
+    raw = "\n".join([str(user.id), request.url.path, repr(params), *extra])
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+    return f'"v{user.data_version}-{digest}"'
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    """Headers that let clients cache a response but revalidate it on every use."""
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag` (weak comparison, as RFC 9110 asks)."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def conditional_get(per_day: bool = False):
+    """
+    Dependency for read endpoints: answers a matching If-None-Match with 304
+    before the endpoint runs, otherwise sets the ETag headers and returns the ETag.
+
+    Use per_day for responses that also depend on today's date (e.g. budget periods).
+    Endpoints that return a Response themselves must add etag_headers() to it.
+    """
+    def check(request: Request, response: Response, current_user: User = Depends(get_current_user)) -> str:
+        extra = [datetime.utcnow().date().isoformat()] if per_day else []
+        etag = make_etag(current_user, request, *extra)
+        headers = etag_headers(etag)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+
+        response.headers.update(headers)
+        return etag
+
+    return check
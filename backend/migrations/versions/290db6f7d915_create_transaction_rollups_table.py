@@ -0,0 +1,46 @@
+"""Create transaction_rollups table
+
+Revision ID: 290db6f7d915
+Revises: 8b3e6a0d5c21
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '290db6f7d915'
+down_revision = '8b3e6a0d5c21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('transaction_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('total_amount', sa.Float(), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'month', 'type', 'category', name='uq_transaction_rollups_key')
+    )
+    op.create_index(op.f('ix_transaction_rollups_id'), 'transaction_rollups', ['id'], unique=False)
+
+    # Build the initial rollups from existing transactions
+    op.execute("""
+        INSERT INTO transaction_rollups (user_id, month, type, category, total_amount, transaction_count)
+        SELECT user_id, to_char(date, 'YYYY-MM'), type, category, SUM(amount), COUNT(id)
+        FROM transactions
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id, to_char(date, 'YYYY-MM'), type, category
+    """)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_transaction_rollups_id'), table_name='transaction_rollups')
+    op.drop_table('transaction_rollups')
@@ -0,0 +1,49 @@
+"""Add pg_trgm GIN indexes for transaction search
+
+Revision ID: 2f9c41d7e8a3
+Revises: 769fd3a0b4ef
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f9c41d7e8a3'
+down_revision = '769fd3a0b4ef'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_COLUMNS = ['description', 'location', 'category']
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for column in SEARCH_COLUMNS:
+            op.create_index(
+                f'ix_transactions_{column}_trgm',
+                'transactions',
+                [column],
+                unique=False,
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for column in reversed(SEARCH_COLUMNS):
+            op.drop_index(
+                f'ix_transactions_{column}_trgm',
+                table_name='transactions',
+                postgresql_concurrently=True,
+                if_exists=True
+            )
+    # The extension is left installed; other database objects may depend on it
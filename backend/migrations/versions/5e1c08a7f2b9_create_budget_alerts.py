@@ -0,0 +1,54 @@
+"""Create budget_alerts table
+
+Revision ID: 5e1c08a7f2b9
+Revises: d3ad513d4b6f
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1c08a7f2b9'
+down_revision = 'd3ad513d4b6f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by scripts/evaluate_budget_alerts.py; /budgets/alerts is empty
+    # until its first run
+    op.create_table('budget_alerts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('budget_id', sa.Integer(), nullable=False),
+        sa.Column('window_start', sa.DateTime(), nullable=False),
+        sa.Column('window_end', sa.DateTime(), nullable=False),
+        sa.Column('threshold', sa.Float(), nullable=False),
+        sa.Column('budget_amount', sa.Float(), nullable=False),
+        sa.Column('spent', sa.Float(), nullable=False),
+        sa.Column('percentage_used', sa.Float(), nullable=False),
+        sa.Column('triggered_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('resolved_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['budget_id'], ['budgets.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('budget_id', 'window_start', 'threshold', name='uq_budget_alerts_key')
+    )
+    op.create_index(op.f('ix_budget_alerts_id'), 'budget_alerts', ['id'], unique=False)
+    op.create_index(
+        'ix_budget_alerts_user_id_open',
+        'budget_alerts',
+        ['user_id', 'triggered_at'],
+        unique=False,
+        postgresql_where=sa.text('resolved_at IS NULL'),
+        sqlite_where=sa.text('resolved_at IS NULL')
+    )
+
+
+def downgrade():
+    op.drop_index('ix_budget_alerts_user_id_open', table_name='budget_alerts')
+    op.drop_index(op.f('ix_budget_alerts_id'), table_name='budget_alerts')
+    op.drop_table('budget_alerts')
@@ -0,0 +1,76 @@
+"""Add delta sync support: categories.updated_at, deleted_records and updated_at indexes
+
+Revision ID: 721c9aa623b9
+Revises: 9fda4c3598d8
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '721c9aa623b9'
+down_revision = '9fda4c3598d8'
+branch_labels = None
+depends_on = None
+
+
+# (name, table) of the (user_id, updated_at, id) indexes served to /sync
+SYNC_INDEXES = [
+    ('ix_transactions_user_id_updated_at', 'transactions'),
+    ('ix_categories_user_id_updated_at', 'categories'),
+    ('ix_budgets_user_id_updated_at', 'budgets'),
+]
+
+
+def upgrade():
+    op.add_column(
+        'categories',
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True)
+    )
+
+    op.create_table('deleted_records',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_deleted_records_id'), 'deleted_records', ['id'], unique=False)
+    op.create_index(
+        'ix_deleted_records_user_id_deleted_at',
+        'deleted_records',
+        ['user_id', 'deleted_at', 'id'],
+        unique=False
+    )
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table in SYNC_INDEXES:
+            op.create_index(
+                name,
+                table,
+                ['user_id', 'updated_at', 'id'],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table in reversed(SYNC_INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
+
+    op.drop_index('ix_deleted_records_user_id_deleted_at', table_name='deleted_records')
+    op.drop_index(op.f('ix_deleted_records_id'), table_name='deleted_records')
+    op.drop_table('deleted_records')
+    op.drop_column('categories', 'updated_at')
@@ -0,0 +1,61 @@
+"""Add composite and covering indexes for transaction hot paths
+
+Revision ID: 769fd3a0b4ef
+Revises: 13c4517bd6a5
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '769fd3a0b4ef'
+down_revision = '13c4517bd6a5'
+branch_labels = None
+depends_on = None
+
+
+# (name, columns, extra create_index kwargs)
+INDEXES = [
+    # Listing sorted by date/amount/created_at, with id as the keyset tie-breaker
+    ('ix_transactions_user_id_date', ['user_id', 'date', 'id'], {}),
+    ('ix_transactions_user_id_amount', ['user_id', 'amount', 'id'], {}),
+    ('ix_transactions_user_id_created_at', ['user_id', 'created_at', 'id'], {}),
+    # Type filter and budget sums over all categories (index-only scan)
+    ('ix_transactions_user_id_type_date', ['user_id', 'type', 'date'],
+     {'postgresql_include': ['amount']}),
+    # Category filter and per-category budget sums (index-only scan)
+    ('ix_transactions_user_id_category_type_date', ['user_id', 'category', 'type', 'date'],
+     {'postgresql_include': ['amount']}),
+    ('ix_transactions_user_id_payment_method_date', ['user_id', 'payment_method', 'date'], {}),
+    # Recurring templates are a small fraction of rows
+    ('ix_transactions_user_id_recurring', ['user_id', 'date'],
+     {'postgresql_where': sa.text('is_recurring')}),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, columns, kwargs in INDEXES:
+            op.create_index(
+                name,
+                'transactions',
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kwargs
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name='transactions',
+                postgresql_concurrently=True,
+                if_exists=True
+            )
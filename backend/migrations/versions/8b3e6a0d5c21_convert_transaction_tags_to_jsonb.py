@@ -0,0 +1,66 @@
+"""Convert transaction tags to JSONB with a GIN index
+
+Revision ID: 8b3e6a0d5c21
+Revises: 2f9c41d7e8a3
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '8b3e6a0d5c21'
+down_revision = '2f9c41d7e8a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows hold json.dumps() output; empty strings and JSON nulls become SQL NULL
+    op.alter_column(
+        'transactions',
+        'tags',
+        existing_type=sa.Text(),
+        type_=postgresql.JSONB(),
+        existing_nullable=True,
+        postgresql_using="""
+            CASE
+                WHEN tags IS NULL OR btrim(tags) IN ('', 'null') THEN NULL
+                ELSE tags::jsonb
+            END
+        """
+    )
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_tags',
+            'transactions',
+            ['tags'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'tags': 'jsonb_path_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transactions_tags',
+            table_name='transactions',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+
+    op.alter_column(
+        'transactions',
+        'tags',
+        existing_type=postgresql.JSONB(),
+        type_=sa.Text(),
+        existing_nullable=True,
+        postgresql_using='tags::text'
+    )
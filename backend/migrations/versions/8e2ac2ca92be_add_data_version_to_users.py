@@ -0,0 +1,25 @@
+"""Add data_version to users
+
+Revision ID: 8e2ac2ca92be
+Revises: 721c9aa623b9
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2ac2ca92be'
+down_revision = '721c9aa623b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A constant default lets PostgreSQL add the column without rewriting the table
+    op.add_column('users', sa.Column('data_version', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+
+def downgrade():
+    op.drop_column('users', 'data_version')
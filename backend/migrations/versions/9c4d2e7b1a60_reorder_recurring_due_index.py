@@ -0,0 +1,47 @@
+"""Key the recurring due index by template id
+
+Revision ID: 9c4d2e7b1a60
+Revises: 5e1c08a7f2b9
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4d2e7b1a60'
+down_revision = '5e1c08a7f2b9'
+branch_labels = None
+depends_on = None
+
+
+def _recreate(columns):
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transactions_recurring_due',
+            table_name='transactions',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+        op.create_index(
+            'ix_transactions_recurring_due',
+            'transactions',
+            columns,
+            unique=False,
+            postgresql_where=sa.text('is_recurring'),
+            sqlite_where=sa.text('is_recurring'),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def upgrade():
+    # The generator pages through due templates by id, so a template whose
+    # watermark it advances is not read again in the same run
+    _recreate(['recurring_frequency', 'id', 'recurring_generated_through'])
+
+
+def downgrade():
+    _recreate(['recurring_frequency', 'recurring_generated_through', 'id'])
@@ -0,0 +1,44 @@
+"""Add idempotency_key to transactions
+
+Revision ID: 9fda4c3598d8
+Revises: 290db6f7d915
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9fda4c3598d8'
+down_revision = '290db6f7d915'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('transactions', sa.Column('idempotency_key', sa.String(), nullable=True))
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_user_id_idempotency_key',
+            'transactions',
+            ['user_id', 'idempotency_key'],
+            unique=True,
+            postgresql_where=sa.text('idempotency_key IS NOT NULL'),
+            sqlite_where=sa.text('idempotency_key IS NOT NULL'),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transactions_user_id_idempotency_key',
+            table_name='transactions',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+    op.drop_column('transactions', 'idempotency_key')
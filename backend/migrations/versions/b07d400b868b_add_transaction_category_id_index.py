@@ -0,0 +1,42 @@
+"""Index transactions by category_id for budget and category queries
+
+Revision ID: b07d400b868b
+Revises: f3939b4f1088
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b07d400b868b'
+down_revision = 'f3939b4f1088'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows get their category_id from scripts/backfill_category_ids.py,
+    # which works in small batches instead of one long UPDATE here.
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_user_id_category_id_type_date',
+            'transactions',
+            ['user_id', 'category_id', 'type', 'date'],
+            unique=False,
+            postgresql_include=['amount'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transactions_user_id_category_id_type_date',
+            table_name='transactions',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
@@ -0,0 +1,76 @@
+"""Order delta sync by sync_seq instead of updated_at
+
+Revision ID: b81f0d6c3e25
+Revises: 9c4d2e7b1a60
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81f0d6c3e25'
+down_revision = '9c4d2e7b1a60'
+branch_labels = None
+depends_on = None
+
+
+# table -> (sync_seq index, timestamp index it replaces, timestamp column)
+SYNC_TABLES = {
+    'transactions': ('ix_transactions_user_id_sync_seq', 'ix_transactions_user_id_updated_at', 'updated_at'),
+    'categories': ('ix_categories_user_id_sync_seq', 'ix_categories_user_id_updated_at', 'updated_at'),
+    'budgets': ('ix_budgets_user_id_sync_seq', 'ix_budgets_user_id_updated_at', 'updated_at'),
+    'deleted_records': ('ix_deleted_records_user_id_sync_seq', 'ix_deleted_records_user_id_deleted_at', 'deleted_at'),
+}
+
+
+def upgrade():
+    for table in SYNC_TABLES:
+        # Existing rows start at 0, which every cursor has passed after a full
+        # sync. A constant default lets PostgreSQL add the column without
+        # rewriting the table; new rows are inserted with NULL until stamped.
+        op.add_column(table, sa.Column('sync_seq', sa.Integer(), server_default=sa.text('0'), nullable=True))
+        if op.get_bind().dialect.name == 'postgresql':
+            # SQLite cannot drop a column default; the models insert NULL explicitly
+            op.alter_column(table, 'sync_seq', server_default=None)
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for table, (sync_index, timestamp_index, _) in SYNC_TABLES.items():
+            op.create_index(
+                sync_index,
+                table,
+                ['user_id', 'sync_seq', 'id'],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+            op.drop_index(
+                timestamp_index,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table, (sync_index, timestamp_index, timestamp_column) in reversed(SYNC_TABLES.items()):
+            op.create_index(
+                timestamp_index,
+                table,
+                ['user_id', timestamp_column, 'id'],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+            op.drop_index(
+                sync_index,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
+
+    for table in reversed(list(SYNC_TABLES)):
+        op.drop_column(table, 'sync_seq')
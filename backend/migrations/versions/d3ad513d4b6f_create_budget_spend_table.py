@@ -0,0 +1,45 @@
+"""Create budget_spend ledger table
+
+Revision ID: d3ad513d4b6f
+Revises: b07d400b868b
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3ad513d4b6f'
+down_revision = 'b07d400b868b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by scripts/reconcile_budget_spend.py after upgrading; until then
+    # budget reads compute spend from transactions as before
+    op.create_table('budget_spend',
+        sa.Column('budget_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('window_start', sa.DateTime(), nullable=False),
+        sa.Column('window_end', sa.DateTime(), nullable=False),
+        sa.Column('spent', sa.Float(), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['budget_id'], ['budgets.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('budget_id')
+    )
+    op.create_index(
+        'ix_budget_spend_user_id_window',
+        'budget_spend',
+        ['user_id', 'window_start', 'window_end'],
+        unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_budget_spend_user_id_window', table_name='budget_spend')
+    op.drop_table('budget_spend')
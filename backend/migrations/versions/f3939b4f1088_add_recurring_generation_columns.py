@@ -0,0 +1,72 @@
+"""Add recurring generation watermark and parent link to transactions
+
+Revision ID: f3939b4f1088
+Revises: 8e2ac2ca92be
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3939b4f1088'
+down_revision = '8e2ac2ca92be'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('transactions', sa.Column('recurring_generated_through', sa.DateTime(), nullable=True))
+    op.add_column('transactions', sa.Column('recurring_parent_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_transactions_recurring_parent_id',
+        'transactions', 'transactions',
+        ['recurring_parent_id'], ['id'],
+        ondelete='SET NULL'
+    )
+
+    # Existing templates start generating from now; their past occurrences were
+    # entered by hand, if at all
+    op.execute(
+        "UPDATE transactions SET recurring_generated_through = CURRENT_TIMESTAMP "
+        "WHERE is_recurring AND recurring_generated_through IS NULL"
+    )
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_recurring_due',
+            'transactions',
+            ['recurring_frequency', 'recurring_generated_through', 'id'],
+            unique=False,
+            postgresql_where=sa.text('is_recurring'),
+            sqlite_where=sa.text('is_recurring'),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.create_index(
+            'ix_transactions_recurring_parent_id_date',
+            'transactions',
+            ['recurring_parent_id', 'date'],
+            unique=True,
+            postgresql_where=sa.text('recurring_parent_id IS NOT NULL'),
+            sqlite_where=sa.text('recurring_parent_id IS NOT NULL'),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in ('ix_transactions_recurring_parent_id_date', 'ix_transactions_recurring_due'):
+            op.drop_index(
+                name,
+                table_name='transactions',
+                postgresql_concurrently=True,
+                if_exists=True
+            )
+
+    op.drop_constraint('fk_transactions_recurring_parent_id', 'transactions', type_='foreignkey')
+    op.drop_column('transactions', 'recurring_parent_id')
+    op.drop_column('transactions', 'recurring_generated_through')
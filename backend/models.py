@@ -1,9 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Index, JSON, UniqueConstraint, null, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.sql import func
 from pydantic import BaseModel, EmailStr, field_validator, ConfigDict
-from typing import Optional, List, Union
+from typing import Dict, Optional, List, Union
 from datetime import datetime
 import os
 from dotenv import load_dotenv
@@ -28,6 +29,7 @@ class User(Base):
     profile_picture_url = Column(String, nullable=True)
     currency = Column(String, default="USD", nullable=False)
     currency_symbol = Column(String, default="$", nullable=False)
+    data_version = Column(Integer, default=0, server_default=text("0"), nullable=False)  # Bumped by every write to the user's data; keys ETags
     
     # Relationships
     transactions = relationship("Transaction", back_populates="user", cascade="all, delete-orphan")
@@ -45,23 +47,104 @@ class Transaction(Base):
     original_currency = Column(String, nullable=True)  # Transaction currency code
     exchange_rate_to_usd = Column(Float, nullable=True)  # Exchange rate to USD at time of transaction
     type = Column(String, nullable=False)  # income or expense
-    category = Column(String, nullable=False)  # TODO: Will be migrated to category_id
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    category = Column(String, nullable=False)  # Category name, as entered; renames of a linked category are carried over
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)  # Resolved from (category, type) on write; NULL when no such category exists
     description = Column(Text, nullable=True)
     date = Column(DateTime, nullable=False)
     payment_method = Column(String, nullable=True)  # cash, credit_card, debit_card, bank_transfer, etc.
     location = Column(String, nullable=True)
-    tags = Column(Text, nullable=True)  # JSON string for multiple tags
+    tags = Column(JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"), nullable=True)  # List of tag strings
     receipt_url = Column(String, nullable=True)
     is_recurring = Column(Boolean, default=False)
     recurring_frequency = Column(String, nullable=True)  # daily, weekly, monthly, yearly
+    recurring_generated_through = Column(DateTime, nullable=True)  # Templates: date of the last materialized occurrence
+    recurring_parent_id = Column(Integer, ForeignKey("transactions.id", ondelete="SET NULL"), nullable=True)  # Occurrences: the template they came from
+    idempotency_key = Column(String, nullable=True)  # Client key from POST /transactions/batch, unique per user
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # data_version of the write that last changed the row; NULL until that
+    # write's bump_data_version stamps it. Delta sync reads rows in this order.
+    sync_seq = Column(Integer, default=null(), onupdate=null())
     
     # Relationships
     user = relationship("User", back_populates="transactions")
     category_rel = relationship("Category", foreign_keys=[category_id])
 
+    # Hot-path indexes; every query is scoped by user_id first
+    __table_args__ = (
+        Index("ix_transactions_user_id_date", "user_id", "date", "id"),
+        Index("ix_transactions_user_id_amount", "user_id", "amount", "id"),
+        Index("ix_transactions_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_transactions_user_id_type_date", "user_id", "type", "date", postgresql_include=["amount"]),
+        Index(
+            "ix_transactions_user_id_category_type_date", "user_id", "category", "type", "date",
+            postgresql_include=["amount"]
+        ),
+        Index(
+            "ix_transactions_user_id_category_id_type_date", "user_id", "category_id", "type", "date",
+            postgresql_include=["amount"]
+        ),
+        Index("ix_transactions_user_id_payment_method_date", "user_id", "payment_method", "date"),
+        Index("ix_transactions_user_id_recurring", "user_id", "date", postgresql_where=text("is_recurring")),
+        # Recurring templates scanned by the generator, per frequency in id order;
+        # the watermark is checked in the index without visiting the rows
+        Index(
+            "ix_transactions_recurring_due", "recurring_frequency", "id", "recurring_generated_through",
+            postgresql_where=text("is_recurring"),
+            sqlite_where=text("is_recurring")
+        ),
+        # At most one materialized occurrence per template and date
+        Index(
+            "ix_transactions_recurring_parent_id_date", "recurring_parent_id", "date",
+            unique=True,
+            postgresql_where=text("recurring_parent_id IS NOT NULL"),
+            sqlite_where=text("recurring_parent_id IS NOT NULL")
+        ),
+        # Delta sync reads rows changed since a cursor
+        Index("ix_transactions_user_id_sync_seq", "user_id", "sync_seq", "id"),
+        # Retried batch items are matched on their idempotency key
+        Index(
+            "ix_transactions_user_id_idempotency_key", "user_id", "idempotency_key",
+            unique=True,
+            postgresql_where=text("idempotency_key IS NOT NULL"),
+            sqlite_where=text("idempotency_key IS NOT NULL")
+        ),
+        # Tag containment (tags @> '["a"]')
+        Index(
+            "ix_transactions_tags", "tags",
+            postgresql_using="gin", postgresql_ops={"tags": "jsonb_path_ops"}
+        ),
+        # Trigram indexes for substring search (PostgreSQL pg_trgm)
+        Index(
+            "ix_transactions_description_trgm", "description",
+            postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}
+        ),
+        Index(
+            "ix_transactions_location_trgm", "location",
+            postgresql_using="gin", postgresql_ops={"location": "gin_trgm_ops"}
+        ),
+        Index(
+            "ix_transactions_category_trgm", "category",
+            postgresql_using="gin", postgresql_ops={"category": "gin_trgm_ops"}
+        ),
+    )
+
+class TransactionRollup(Base):
+    """Per-user monthly totals, kept in step with transaction writes."""
+    __tablename__ = "transaction_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(String(7), nullable=False)  # YYYY-MM
+    type = Column(String, nullable=False)  # income or expense
+    category = Column(String, nullable=False)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "month", "type", "category", name="uq_transaction_rollups_key"),
+    )
+
 class Category(Base):
     __tablename__ = "categories"
     
@@ -73,11 +156,19 @@ class Category(Base):
     color = Column(String, nullable=True)
     budget_limit = Column(Float, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # data_version of the write that last changed the row; NULL until that
+    # write's bump_data_version stamps it. Delta sync reads rows in this order.
+    sync_seq = Column(Integer, default=null(), onupdate=null())
     
     # Relationships
     user = relationship("User", back_populates="categories")
     budgets = relationship("Budget", back_populates="category", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_categories_user_id_sync_seq", "user_id", "sync_seq", "id"),
+    )
+
 class Budget(Base):
     __tablename__ = "budgets"
     
@@ -93,10 +184,80 @@ class Budget(Base):
     alert_threshold = Column(Float, default=80.0)  # Alert when X% of budget is used
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # data_version of the write that last changed the row; NULL until that
+    # write's bump_data_version stamps it. Delta sync reads rows in this order.
+    sync_seq = Column(Integer, default=null(), onupdate=null())
     
     # Relationships
     user = relationship("User", back_populates="budgets")
     category = relationship("Category", back_populates="budgets")
+    spend = relationship("BudgetSpend", uselist=False, cascade="all, delete-orphan")
+    alerts = relationship("BudgetAlert", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_budgets_user_id_sync_seq", "user_id", "sync_seq", "id"),
+    )
+
+class BudgetSpend(Base):
+    """Expense total of a budget's window, kept in step with transaction writes."""
+    __tablename__ = "budget_spend"
+
+    budget_id = Column(Integer, ForeignKey("budgets.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    category_id = Column(Integer, nullable=True)  # The budget's category; NULL counts every category
+    window_start = Column(DateTime, nullable=False)
+    window_end = Column(DateTime, nullable=False)
+    spent = Column(Float, nullable=False, default=0.0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Writes look up the user's budgets whose window contains the transaction date
+        Index("ix_budget_spend_user_id_window", "user_id", "window_start", "window_end"),
+    )
+
+class BudgetAlert(Base):
+    """A budget crossing its alert threshold, recorded by budget_alerts.evaluate_budget_alerts()."""
+    __tablename__ = "budget_alerts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    budget_id = Column(Integer, ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False)
+    window_start = Column(DateTime, nullable=False)  # Budget window the crossing happened in
+    window_end = Column(DateTime, nullable=False)
+    threshold = Column(Float, nullable=False)  # alert_threshold that was crossed
+    budget_amount = Column(Float, nullable=False)
+    spent = Column(Float, nullable=False)  # As of the last evaluation
+    percentage_used = Column(Float, nullable=False)
+    triggered_at = Column(DateTime, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    resolved_at = Column(DateTime, nullable=True)  # Set once the budget is back under its threshold or inactive
+
+    __table_args__ = (
+        # One alert per budget, window and threshold; re-evaluations update it
+        UniqueConstraint("budget_id", "window_start", "threshold", name="uq_budget_alerts_key"),
+        # Open alerts of a user, read by /budgets/alerts
+        Index(
+            "ix_budget_alerts_user_id_open", "user_id", "triggered_at",
+            postgresql_where=text("resolved_at IS NULL"),
+            sqlite_where=text("resolved_at IS NULL")
+        ),
+    )
+
+class DeletedRecord(Base):
+    """Tombstone for a deleted transaction, category or budget, served by /sync."""
+    __tablename__ = "deleted_records"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entity = Column(String, nullable=False)  # transaction, category or budget
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, server_default=func.now(), nullable=False)
+    sync_seq = Column(Integer, default=null())  # data_version of the deleting write, as on synced rows
+
+    __table_args__ = (
+        Index("ix_deleted_records_user_id_sync_seq", "user_id", "sync_seq", "id"),
+    )
 
 class CurrencyConversion(Base):
     __tablename__ = "currency_conversions"
@@ -178,6 +339,13 @@ class TransactionBase(BaseModel):
 class TransactionCreate(TransactionBase):
     pass
 
+class TransactionBatchItem(TransactionCreate):
+    # Retrying an item with the same key returns the original transaction
+    idempotency_key: Optional[str] = None
+
+class TransactionBatchCreate(BaseModel):
+    items: List[TransactionBatchItem]
+
 class TransactionUpdate(BaseModel):
     amount: Optional[float] = None
     type: Optional[str] = None
@@ -213,6 +381,7 @@ class TransactionResponse(BaseModel):
     receipt_url: Optional[str] = None
     is_recurring: bool = False
     recurring_frequency: Optional[str] = None
+    recurring_parent_id: Optional[int] = None  # Set on occurrences generated from a recurring template
     created_at: str  # Changed to string
     updated_at: str  # Changed to string
 
@@ -224,6 +393,19 @@ class TransactionResponse(BaseModel):
             return v.isoformat()
         return v
 
+class TransactionBatchResult(BaseModel):
+    index: int  # Position of the item in the request
+    status: str  # created, duplicate or error
+    idempotency_key: Optional[str] = None
+    transaction: Optional[TransactionResponse] = None
+    error: Optional[str] = None
+
+class TransactionBatchResponse(BaseModel):
+    results: List[TransactionBatchResult]
+    created: int
+    duplicates: int
+    errors: int
+
 class TransactionFilter(BaseModel):
     start_date: Optional[Union[datetime, str]] = None
     end_date: Optional[Union[datetime, str]] = None
@@ -283,17 +465,73 @@ class TransactionStatistics(BaseModel):
     daily_average: float
     monthly_trend: List[dict]
 
+class TransactionSummarySeries(BaseModel):
+    key: Optional[str] = None  # Value of the split_by column; null when not split
+    income: List[float]  # One value per bucket
+    expenses: List[float]
+    count: List[int]
+
+class TransactionSummary(BaseModel):
+    bucket: str  # day, week, month or year
+    split_by: Optional[str] = None
+    buckets: List[str]  # Start date of every bucket in the range, empty ones included
+    series: List[TransactionSummarySeries]
+
+class CategoryTrend(BaseModel):
+    category: str
+    totals: List[float]  # One value per month
+    mom_delta: List[float]  # Change from the previous month
+    mom_pct: List[Optional[float]]  # Null when the previous month is zero
+    yoy_delta: List[float]  # Change from the same month a year earlier
+    yoy_pct: List[Optional[float]]
+
+class TransactionTrends(BaseModel):
+    type: str  # income or expense
+    end_date: str
+    start_date: str  # Day of index 0 of daily_totals and moving_averages
+    daily_totals: List[float]
+    moving_averages: Dict[str, List[float]]  # Window in days ("7", "30", "90") -> one value per day
+    months: List[str]  # YYYY-MM, one per entry of each category's arrays
+    categories: List[CategoryTrend]
+
+class TransactionAggregateRow(BaseModel):
+    group: Dict[str, Optional[str]]  # Dimension -> value; dimensions left out are totals
+    sum: Optional[float] = None  # Present when requested in measures
+    count: Optional[int] = None
+    avg: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class TransactionAggregate(BaseModel):
+    dimensions: List[str]
+    measures: List[str]
+    totals: str  # none, rollup or cube
+    bucket: Optional[str] = None  # Granularity of the date dimension
+    rows: List[TransactionAggregateRow]
+    truncated: bool  # More rows matched than are returned
+
+class TransactionHeatmap(BaseModel):
+    year: int
+    start_date: str  # Day of index 0; index i is start_date + i days
+    days: int  # 365 or 366
+    category: Optional[str] = None
+    income: List[float]  # One value per day
+    expenses: List[float]
+    count: List[int]
+
 class BulkTransactionOperation(BaseModel):
     transaction_ids: List[int]
-    operation: str  # delete, update_category, add_tags
+    operation: str  # delete, update_category, update_payment_method, add_tags, remove_tags
     data: Optional[dict] = None
 
 class PaginatedTransactionResponse(BaseModel):
     items: List[TransactionResponse]
     total: int
+    total_exact: bool = True  # False when total is a capped ("N+") or estimated count
     page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to fetch the following page
 
 class BudgetBase(BaseModel):
     name: str
@@ -355,8 +593,48 @@ class BudgetResponse(BaseModel):
             return v.isoformat()
         return v
 
+class RecurringOccurrence(BaseModel):
+    template_id: int  # The recurring transaction this occurrence repeats
+    date: str
+    amount: float
+    type: str
+    category: str
+    category_id: Optional[int] = None
+    description: Optional[str] = None
+    payment_method: Optional[str] = None
+    recurring_frequency: str
+
+class SyncDeleted(BaseModel):
+    transactions: List[int] = []
+    categories: List[int] = []
+    budgets: List[int] = []
+
+class SyncResponse(BaseModel):
+    transactions: List[TransactionResponse]
+    categories: List[CategoryResponse]
+    budgets: List[BudgetResponse]
+    deleted: SyncDeleted
+    next_cursor: str  # Pass back as `since` on the next sync
+    has_more: bool  # More changes are waiting; sync again right away
+
 class BudgetWithUsage(BudgetResponse):
     current_spent: float
     percentage_used: float
     remaining_amount: float
-    days_remaining: Optional[int] = None
\ No newline at end of file
+    days_remaining: Optional[int] = None
+
+class BudgetPeriodUsage(BaseModel):
+    period_start: str
+    period_end: str
+    spent: float
+    transaction_count: int
+    percentage_used: float
+    remaining_amount: float
+
+class BudgetHistory(BaseModel):
+    budget_id: int
+    name: str
+    period: str
+    amount: float
+    category_id: Optional[int] = None
+    periods: List[BudgetPeriodUsage]  # Oldest first, from the period containing start_date at the earliest
\ No newline at end of file
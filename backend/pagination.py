@@ -0,0 +1,155 @@
+import base64
+import hashlib
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import DateTime, func, literal_column, tuple_
+from sqlalchemy.orm import Session
+
+from sql_utils import timestamp_key
+
+# Sort columns whose cursor values are datetimes and must be round-tripped as ISO strings
+DATETIME_SORT_COLUMNS = {"date", "created_at"}
+
+# Exact totals cached per user, data version and filter hash (in production, use
+# Redis). Every write bumps the user's data version, so an entry is never served
+# stale, in this process or any other; superseded versions are simply replaced.
+COUNT_CACHE_MAX_USERS = 1024
+COUNT_CACHE_MAX_ENTRIES_PER_USER = 64
+_count_cache: Dict[int, Tuple[int, Dict[str, int]]] = {}
+# Sync endpoints run in a threadpool; guards _count_cache
+_count_cache_lock = threading.Lock()
+
+
+def encode_cursor(sort_by: str, sort_order: str, value: Any, row_id: int) -> str:
+    """
+    Encode the position of the last row of a page into an opaque cursor.
+    The cursor remembers the sort it was issued for so it cannot be replayed
+    against a different ordering.
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = {"s": sort_by, "o": sort_order, "v": value, "i": row_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> Tuple[Any, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+    Raises ValueError if the cursor is malformed or was issued for another sort.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        cursor_sort, cursor_order = payload["s"], payload["o"]
+        value, row_id = payload["v"], int(payload["i"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+    if cursor_sort != sort_by or cursor_order != sort_order:
+        raise ValueError("Cursor does not match the requested sort order")
+
+    if value is None:
+        raise ValueError("Invalid cursor")
+    if sort_by in DATETIME_SORT_COLUMNS:
+        value = datetime.fromisoformat(value)
+    else:
+        value = float(value)
+
+    return value, row_id
+
+
+def apply_keyset(query, sort_column, id_column, sort_order: str, cursor_position: Optional[Tuple[Any, int]] = None):
+    """
+    Order a query by (sort column, id) and, if a cursor position is given,
+    restrict it to the rows strictly after that position.
+    """
+    datetime_sort = isinstance(sort_column.type, DateTime)
+    if datetime_sort:
+        # On SQLite, now() defaults and bound datetimes are stored in different
+        # string forms; compare and order both sides in the same form
+        sort_column = timestamp_key(query.session, sort_column)
+    if cursor_position is not None:
+        value, row_id = cursor_position
+        if datetime_sort:
+            value = timestamp_key(query.session, value)
+        # Row-value comparison lets the planner seek straight into a (sort column, id) index
+        position = tuple_(sort_column, id_column)
+        if sort_order == "desc":
+            query = query.filter(position < tuple_(value, row_id))
+        else:
+            query = query.filter(position > tuple_(value, row_id))
+
+    if sort_order == "desc":
+        return query.order_by(sort_column.desc(), id_column.desc())
+    return query.order_by(sort_column.asc(), id_column.asc())
+
+
+def filter_hash(filters: Dict[str, Any]) -> str:
+    """Stable hash of the filter parameters that determine a result set."""
+    normalized = {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in filters.items()
+        if value is not None
+    }
+    raw = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def cached_exact_count(query, user_id: int, data_version: int, key: str) -> int:
+    """Exact COUNT(*) of a query at the user's data version, served from the cache when possible."""
+    with _count_cache_lock:
+        version, entries = _count_cache.get(user_id, (None, None))
+        if version == data_version and key in entries:
+            return entries[key]
+
+    # Count outside the lock; concurrent misses may both count, which is harmless
+    total = query.order_by(None).count()
+    with _count_cache_lock:
+        version, entries = _count_cache.get(user_id, (None, None))
+        if version is not None and version > data_version:
+            # A newer version was cached while this one was counting
+            return total
+        if version != data_version:
+            if user_id not in _count_cache and len(_count_cache) >= COUNT_CACHE_MAX_USERS:
+                # Evict the least recently written user
+                _count_cache.pop(next(iter(_count_cache)), None)
+            entries = {}
+            _count_cache.pop(user_id, None)
+            _count_cache[user_id] = (data_version, entries)
+        if len(entries) >= COUNT_CACHE_MAX_ENTRIES_PER_USER:
+            entries.pop(next(iter(entries)), None)
+        entries[key] = total
+    return total
+
+
+def capped_count(query, cap: int) -> Tuple[int, bool]:
+    """
+    Count at most `cap` rows of a query.
+    Returns (count, is_exact); when the cap is hit the count is `cap` and not exact.
+    """
+    limited = query.order_by(None).with_entities(literal_column("1").label("one")).limit(cap + 1).subquery()
+    count = query.session.query(func.count()).select_from(limited).scalar() or 0
+    if count > cap:
+        return cap, False
+    return count, True
+
+
+def estimated_count(db: Session, query) -> Optional[int]:
+    """
+    Row estimate from the PostgreSQL planner, without executing the query.
+    Returns None on other databases.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return None
+
+    compiled = query.order_by(None).statement.compile(dialect=db.bind.dialect)
+    result = db.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compiled),
+        compiled.params
+    ).scalar()
+    plan = json.loads(result) if isinstance(result, str) else result
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,239 @@
+import heapq
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import and_, case, select, update
+from sqlalchemy.orm import Session
+
+from models import Transaction
+from rollups import RollupDeltas, add_delta, apply_user_rollup_deltas
+from budget_spend import SpendDeltas, add_spend_delta, apply_user_spend_deltas
+from sql_utils import id_in, is_postgresql
+
+FREQUENCY_STEPS = {
+    "daily": relativedelta(days=1),
+    "weekly": relativedelta(weeks=1),
+    "monthly": relativedelta(months=1),
+    "yearly": relativedelta(years=1),
+}
+
+# Shortest gap between two occurrences. Nothing can be due for a template whose
+# watermark is more recent than this before now.
+MIN_INTERVALS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+    "monthly": timedelta(days=28),
+    "yearly": timedelta(days=365),
+}
+
+# Occurrences materialized per template in one run; templates further behind catch up over later runs
+MAX_OCCURRENCES_PER_RUN = 1000
+# Occurrence rows per INSERT
+INSERT_CHUNK_SIZE = 5000
+
+# Columns copied from a template onto each of its occurrences
+TEMPLATE_FIELDS = [
+    "user_id", "amount", "original_amount", "original_currency", "exchange_rate_to_usd",
+    "type", "category", "category_id", "description", "payment_method", "location", "tags",
+]
+TEMPLATE_COLUMNS = [
+    Transaction.id,
+    Transaction.date,
+    Transaction.recurring_frequency,
+    Transaction.recurring_generated_through,
+] + [getattr(Transaction, name) for name in TEMPLATE_FIELDS]
+
+
+def _first_index_after(anchor: datetime, frequency: str, after: datetime) -> int:
+    """A lower bound for the index of the first occurrence after `after`."""
+    if after <= anchor:
+        return 1
+    if frequency == "daily":
+        n = (after - anchor).days
+    elif frequency == "weekly":
+        n = (after - anchor).days // 7
+    elif frequency == "monthly":
+        n = (after.year - anchor.year) * 12 + after.month - anchor.month
+    else:
+        n = after.year - anchor.year
+    return max(1, n - 1)
+
+
+def occurrence_dates(anchor: datetime, frequency: str, after: datetime, until: datetime) -> Iterator[datetime]:
+    """
+    Dates of a template's occurrences in (after, until], earliest first.
+    Occurrence n is `anchor` plus n steps, so month ends don't drift (Jan 31, Feb 28, Mar 31).
+    """
+    step = FREQUENCY_STEPS[frequency]
+    n = _first_index_after(anchor, frequency, after)
+    while True:
+        date = anchor + step * n
+        if date > until:
+            return
+        if date > after:
+            yield date
+        n += 1
+
+
+def initialize_watermarks(db: Session) -> int:
+    """
+    Start templates that have never been processed at their own date (the
+    template itself is occurrence 0). Returns the number of templates updated.
+    """
+    result = db.execute(
+        update(Transaction)
+        .where(
+            and_(
+                Transaction.is_recurring == True,
+                Transaction.recurring_generated_through.is_(None)
+            )
+        )
+        # The watermark is bookkeeping, not a change clients need to sync
+        .values(
+            recurring_generated_through=Transaction.date,
+            updated_at=Transaction.updated_at,
+            sync_seq=Transaction.sync_seq
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def due_templates_query(
+    frequency: str,
+    now: datetime,
+    after_id: Optional[int] = None,
+    limit: int = 1000
+):
+    """
+    Up to `limit` templates of one frequency that may have occurrences due by `now`,
+    in id order after `after_id`. Read as a range scan on ix_transactions_recurring_due,
+    which checks the watermark in the index, so rows are only visited for candidates.
+    Paging by id rather than by watermark means a template whose watermark this run
+    advances is not met again in the same run.
+    """
+    query = select(*TEMPLATE_COLUMNS).where(
+        and_(
+            Transaction.is_recurring == True,
+            Transaction.recurring_frequency == frequency,
+            Transaction.recurring_generated_through <= now - MIN_INTERVALS[frequency]
+        )
+    )
+    if after_id is not None:
+        query = query.where(Transaction.id > after_id)
+    return query.order_by(Transaction.id).limit(limit)
+
+
+def due_templates(
+    db: Session,
+    frequency: str,
+    now: datetime,
+    after_id: Optional[int] = None,
+    limit: int = 1000
+) -> list:
+    """Rows of due_templates_query()."""
+    return db.execute(due_templates_query(frequency, now, after_id, limit)).all()
+
+
+def _insert_occurrences(
+    db: Session,
+    rows: List[dict],
+    deltas_by_user: Dict[int, RollupDeltas],
+    spend_by_user: Dict[int, SpendDeltas]
+):
+    """Insert occurrence rows, skipping any that already exist, and collect rollup and spend deltas for the new ones."""
+    if is_postgresql(db):
+        from sqlalchemy.dialects.postgresql import insert as insert_
+    else:
+        from sqlalchemy.dialects.sqlite import insert as insert_
+
+    table = Transaction.__table__
+    stmt = (
+        insert_(table)
+        .on_conflict_do_nothing(
+            index_elements=["recurring_parent_id", "date"],
+            index_where=table.c.recurring_parent_id.isnot(None)
+        )
+        .returning(table.c.user_id, table.c.date, table.c.type, table.c.category, table.c.category_id, table.c.amount)
+    )
+    for row in db.execute(stmt, rows):
+        add_delta(deltas_by_user.setdefault(row.user_id, {}), row.date, row.type, row.category, row.amount)
+        add_spend_delta(spend_by_user.setdefault(row.user_id, {}), row.date, row.type, row.category_id, row.amount)
+
+
+def materialize_occurrences(db: Session, templates: Iterable, now: datetime) -> Tuple[int, List[int]]:
+    """
+    Write the occurrences of `templates` due by `now` and advance their watermarks,
+    in the caller's transaction. Inserts are chunked multi-row statements and the
+    watermarks move in one UPDATE. Returns (occurrences created, affected user ids).
+    """
+    rows: List[dict] = []
+    watermarks: Dict[int, datetime] = {}
+    deltas_by_user: Dict[int, RollupDeltas] = {}
+    spend_by_user: Dict[int, SpendDeltas] = {}
+
+    for template in templates:
+        dates = list(islice(
+            occurrence_dates(template.date, template.recurring_frequency, template.recurring_generated_through, now),
+            MAX_OCCURRENCES_PER_RUN
+        ))
+        if not dates:
+            continue
+        watermarks[template.id] = dates[-1]
+        copied = {name: getattr(template, name) for name in TEMPLATE_FIELDS}
+        for date in dates:
+            rows.append({**copied, "date": date, "is_recurring": False, "recurring_parent_id": template.id})
+        if len(rows) >= INSERT_CHUNK_SIZE:
+            _insert_occurrences(db, rows, deltas_by_user, spend_by_user)
+            rows = []
+
+    if rows:
+        _insert_occurrences(db, rows, deltas_by_user, spend_by_user)
+    if not watermarks:
+        return 0, []
+
+    db.execute(
+        update(Transaction)
+        .where(id_in(db, Transaction.id, watermarks))
+        .values(
+            recurring_generated_through=case(watermarks, value=Transaction.id),
+            updated_at=Transaction.updated_at,
+            sync_seq=Transaction.sync_seq
+        )
+        .execution_options(synchronize_session=False)
+    )
+    apply_user_rollup_deltas(db, deltas_by_user)
+    apply_user_spend_deltas(db, spend_by_user)
+
+    created = sum(count for deltas in deltas_by_user.values() for _, count in deltas.values())
+    return created, list(deltas_by_user)
+
+
+def upcoming_occurrences(templates: Iterable, until: datetime, limit: int) -> List[dict]:
+    """
+    Projected occurrences of `templates` after their watermarks and up to `until`,
+    earliest first, without writing anything. Includes occurrences that are due
+    but have not been materialized yet.
+    """
+    def occurrences(template):
+        after = template.recurring_generated_through or template.date
+        for date in occurrence_dates(template.date, template.recurring_frequency, after, until):
+            yield date, template.id, template
+
+    merged = heapq.merge(*(occurrences(template) for template in templates))
+    return [
+        {
+            "template_id": template.id,
+            "date": date.isoformat(),
+            "amount": template.amount,
+            "type": template.type,
+            "category": template.category,
+            "category_id": template.category_id,
+            "description": template.description,
+            "payment_method": template.payment_method,
+            "recurring_frequency": template.recurring_frequency,
+        }
+        for date, _, template in islice(merged, limit)
+    ]
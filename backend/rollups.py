@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from models import Transaction, TransactionRollup
+from sql_utils import is_postgresql, month_key
+
+# (month, type, category) -> (amount delta, count delta)
+RollupDeltas = Dict[Tuple[str, str, str], Tuple[float, int]]
+
+
+def month_of(date: datetime) -> str:
+    """Rollup month key ('YYYY-MM') of a transaction date."""
+    return date.strftime("%Y-%m")
+
+
+def is_month_aligned(start_date: Optional[datetime], end_date: Optional[datetime]) -> bool:
+    """
+    Whether [start_date, end_date] covers whole calendar months, so totals can be
+    read from rollups. Open ends count as aligned. Raw queries filter
+    `date <= end_date`, so end_date must be the last representable instant of a
+    month (e.g. 2024-01-31 23:59:59.999999); an end at 23:59:59 would leave out
+    rows in the final second that the rollup counts.
+    """
+    if start_date is not None and (
+        start_date.day != 1 or start_date.time() != datetime.min.time()
+    ):
+        return False
+    if end_date is not None:
+        next_instant = end_date + timedelta(microseconds=1)
+        if next_instant.day != 1 or next_instant.time() != datetime.min.time():
+            return False
+    return True
+
+
+def add_delta(deltas: RollupDeltas, date: datetime, type: str, category: str, amount: float, count: int = 1):
+    """Accumulate the effect of adding (count=1) or removing (count=-1) one transaction."""
+    add_group_delta(deltas, month_of(date), type, category, amount * count, count)
+
+
+def add_group_delta(deltas: RollupDeltas, month: str, type: str, category: str, amount: float, count: int):
+    """Accumulate an already-aggregated change (e.g. a row from group_totals)."""
+    key = (month, type, category)
+    total, n = deltas.get(key, (0.0, 0))
+    deltas[key] = (total + amount, n + count)
+
+
+def apply_rollup_deltas(db: Session, user_id: int, deltas: RollupDeltas):
+    """
+    Upsert accumulated deltas into the user's rollups in the caller's transaction.
+    Rows whose count drops to zero are removed.
+    """
+    apply_user_rollup_deltas(db, {user_id: deltas})
+
+
+def apply_user_rollup_deltas(db: Session, deltas_by_user: Dict[int, RollupDeltas]):
+    """apply_rollup_deltas for several users at once, in a single upsert."""
+    values = [
+        {
+            "user_id": user_id,
+            "month": month,
+            "type": type_,
+            "category": category,
+            "total_amount": amount,
+            "transaction_count": count,
+        }
+        for user_id, deltas in deltas_by_user.items()
+        for (month, type_, category), (amount, count) in deltas.items()
+        if amount or count
+    ]
+    if not values:
+        return
+
+    if is_postgresql(db):
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+
+    stmt = upsert(TransactionRollup).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "month", "type", "category"],
+        set_={
+            "total_amount": TransactionRollup.total_amount + stmt.excluded.total_amount,
+            "transaction_count": TransactionRollup.transaction_count + stmt.excluded.transaction_count,
+        }
+    )
+    db.execute(stmt)
+
+    shrunk = [
+        user_id for user_id, deltas in deltas_by_user.items()
+        if any(count < 0 for _, count in deltas.values())
+    ]
+    if shrunk:
+        db.execute(
+            delete(TransactionRollup).where(
+                and_(
+                    TransactionRollup.user_id.in_(shrunk),
+                    TransactionRollup.transaction_count <= 0
+                )
+            )
+        )
+
+
+def record_transaction(db: Session, transaction: Transaction, count: int = 1):
+    """Add (count=1) or remove (count=-1) a single transaction from its user's rollups."""
+    if transaction.user_id is None:
+        return
+    deltas: RollupDeltas = {}
+    add_delta(deltas, transaction.date, transaction.type, transaction.category, transaction.amount, count)
+    apply_rollup_deltas(db, transaction.user_id, deltas)
+
+
+def _grouped_transactions(db: Session, user_ids: Optional[List[int]] = None, months: Optional[Iterable[str]] = None):
+    """Rollup rows recomputed from raw transactions."""
+    month = month_key(db, Transaction.date)
+    query = select(
+        Transaction.user_id,
+        month.label("month"),
+        Transaction.type,
+        Transaction.category,
+        func.sum(Transaction.amount).label("total_amount"),
+        func.count(Transaction.id).label("transaction_count")
+    ).where(Transaction.user_id.isnot(None))
+    if user_ids is not None:
+        query = query.where(Transaction.user_id.in_(user_ids))
+    if months is not None:
+        query = query.where(month.in_(list(months)))
+    return query.group_by(Transaction.user_id, month, Transaction.type, Transaction.category)
+
+
+def group_totals(db: Session, user_id: int, condition) -> list:
+    """
+    Rollup-shaped totals (month, type, category, total_amount, transaction_count)
+    of the user's transactions matching `condition`, for set-based writes that
+    adjust rollups without touching individual rows.
+    """
+    return db.execute(
+        _grouped_transactions(db, [user_id]).where(condition)
+    ).all()
+
+
+def refresh_rollups(db: Session, user_ids: List[int], months: Optional[Iterable[str]] = None):
+    """
+    Recompute rollups from raw rows for the given users (and optionally only some
+    months) with one DELETE and one INSERT ... SELECT, in the caller's transaction.
+    """
+    if not user_ids:
+        return
+    if months is not None:
+        months = sorted(set(months))
+        if not months:
+            return
+
+    stale = delete(TransactionRollup).where(TransactionRollup.user_id.in_(user_ids))
+    if months is not None:
+        stale = stale.where(TransactionRollup.month.in_(months))
+    db.execute(stale)
+
+    grouped = _grouped_transactions(db, user_ids, months)
+    db.execute(
+        insert(TransactionRollup).from_select(
+            ["user_id", "month", "type", "category", "total_amount", "transaction_count"],
+            grouped
+        )
+    )
+
+
+def find_rollup_drift(db: Session, user_ids: List[int], tolerance: float = 0.005) -> List[dict]:
+    """Compare stored rollups with raw transactions and list every key that differs."""
+    expected = {
+        (row.user_id, row.month, row.type, row.category): (row.total_amount, row.transaction_count)
+        for row in db.execute(_grouped_transactions(db, user_ids))
+    }
+    stored = {
+        (row.user_id, row.month, row.type, row.category): (row.total_amount, row.transaction_count)
+        for row in db.query(TransactionRollup).filter(TransactionRollup.user_id.in_(user_ids))
+    }
+
+    drift = []
+    for key in sorted(expected.keys() | stored.keys(), key=str):
+        expected_amount, expected_count = expected.get(key, (0.0, 0))
+        stored_amount, stored_count = stored.get(key, (0.0, 0))
+        if expected_count != stored_count or abs(expected_amount - stored_amount) > tolerance:
+            user_id, month, type_, category = key
+            drift.append({
+                "user_id": user_id,
+                "month": month,
+                "type": type_,
+                "category": category,
+                "expected_amount": expected_amount,
+                "stored_amount": stored_amount,
+                "expected_count": expected_count,
+                "stored_count": stored_count,
+            })
+    return drift
@@ -23,6 +23,7 @@ from auth import (
 from google.oauth2 import id_token
 from google.auth.transport import requests
 from currency_utils import get_currency_from_ip, get_currency_symbol
+from etag_utils import bump_data_version
 
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8060")
@@ -216,4 +217,5 @@ def create_default_categories(user_id: int, db: Session):
         )
         db.add(category)
     
+    bump_data_version(db, user_id)
     db.commit()
\ No newline at end of file
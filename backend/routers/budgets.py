@@ -1,22 +1,35 @@
 from typing import List, Optional
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, or_
 from dateutil.relativedelta import relativedelta
 
 from models import (
     SessionLocal,
     Budget,
+    BudgetAlert,
     BudgetCreate,
+    BudgetHistory,
+    BudgetPeriodUsage,
     BudgetUpdate,
     BudgetResponse,
     BudgetWithUsage,
-    Transaction,
     Category,
     User
 )
 from auth import get_current_user
+from budget_alerts import evaluate_budget_alerts
+from budget_spend import (
+    MAX_HISTORY_PERIODS,
+    budget_history,
+    budget_window,
+    refresh_budget_spend,
+    spend_window,
+    spent_by_budget
+)
+from sync_utils import record_deletions
+from etag_utils import bump_data_version, conditional_get
 
 router = APIRouter()
 
@@ -28,77 +41,77 @@ def get_db():
     finally:
         db.close()
 
-def calculate_budget_period_dates(period: str, reference_date: datetime = None):
-    """Calculate start and end dates for a budget period"""
-    if reference_date is None:
-        reference_date = datetime.utcnow()
+def calculate_budget_usages(budgets: List[Budget], db: Session) -> dict:
+    """
+    Current spending and usage percentage for each budget, keyed by budget id.
+    Spending is read from the budget_spend ledger; budgets without an up-to-date
+    ledger row (e.g. not reconciled yet) are computed from transactions by
+    category_id in one grouped query. Load budgets with joinedload(Budget.category)
+    and joinedload(Budget.spend) to avoid queries per budget.
+    """
+    spent = {}
+    stale_windows = []
+    for budget in budgets:
+        window = spend_window(budget)
+        ledger = budget.spend
+        if ledger and (ledger.category_id, ledger.window_start, ledger.window_end) == window[2:]:
+            spent[budget.id] = ledger.spent
+        else:
+            stale_windows.append(window)
     
-    if period == "monthly":
-        start_date = reference_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        end_date = (start_date + relativedelta(months=1)) - timedelta(seconds=1)
-    elif period == "quarterly":
-        quarter = (reference_date.month - 1) // 3
-        start_date = datetime(reference_date.year, quarter * 3 + 1, 1)
-        end_date = (start_date + relativedelta(months=3)) - timedelta(seconds=1)
-    elif period == "yearly":
-        start_date = reference_date.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        end_date = reference_date.replace(month=12, day=31, hour=23, minute=59, second=59, microsecond=999999)
-    else:
-        raise ValueError(f"Invalid period: {period}")
+    for budget_id, (amount, _) in spent_by_budget(db, stale_windows).items():
+        spent[budget_id] = amount
     
-    return start_date, end_date
+    now = datetime.utcnow()
+    usages = {}
+    for budget in budgets:
+        _, end_date = budget_window(budget)
+        current_spent = spent.get(budget.id) or 0.0
+        usages[budget.id] = {
+            "current_spent": current_spent,
+            "percentage_used": (current_spent / budget.amount * 100) if budget.amount > 0 else 0.0,
+            "remaining_amount": budget.amount - current_spent,
+            # Calculate days remaining
+            "days_remaining": 0 if now > end_date else (end_date - now).days
+        }
+    return usages
 
 def calculate_budget_usage(budget: Budget, db: Session):
     """Calculate current spending and usage percentage for a budget"""
-    # Use the budget's actual start and end dates
-    start_date = budget.start_date
-    
-    # If budget has an end_date, use it; otherwise calculate based on period
-    if budget.end_date:
-        end_date = budget.end_date
-    else:
-        # Calculate end date based on period from start_date
-        if budget.period == "monthly":
-            end_date = start_date + relativedelta(months=1) - timedelta(seconds=1)
-        elif budget.period == "quarterly":
-            end_date = start_date + relativedelta(months=3) - timedelta(seconds=1)
-        elif budget.period == "yearly":
-            end_date = start_date + relativedelta(years=1) - timedelta(seconds=1)
-        else:
-            # Default to one month if period is unknown
-            end_date = start_date + relativedelta(months=1) - timedelta(seconds=1)
-    
-    # Build query for transactions
-    query = db.query(func.sum(Transaction.amount)).filter(
-        and_(
-            Transaction.user_id == budget.user_id,
-            Transaction.type == 'expense',
-            Transaction.date >= start_date,
-            Transaction.date <= end_date
+    return calculate_budget_usages([budget], db)[budget.id]
+
+def _with_usage(budgets: List[Budget], db: Session) -> List[BudgetWithUsage]:
+    usages = calculate_budget_usages(budgets, db)
+    budget_responses = []
+    for budget in budgets:
+        # Create response with usage
+        budget_dict = budget.__dict__.copy()
+        budget_dict.update(usages[budget.id])
+        budget_responses.append(BudgetWithUsage(**budget_dict))
+    return budget_responses
+
+def _with_history(budgets: List[Budget], periods: int, db: Session) -> List[BudgetHistory]:
+    history = budget_history(db, budgets, periods)
+    return [
+        BudgetHistory(
+            budget_id=budget.id,
+            name=budget.name,
+            period=budget.period,
+            amount=budget.amount,
+            category_id=budget.category_id,
+            periods=[
+                BudgetPeriodUsage(
+                    **{
+                        **usage,
+                        "period_start": usage["period_start"].isoformat(),
+                        "period_end": usage["period_end"].isoformat()
+                    }
+                )
+                for usage in history[budget.id]
+            ]
         )
-    )
-    
-    # Filter by category if specified
-    if budget.category_id and budget.category:
-        query = query.filter(Transaction.category == budget.category.name)
-    
-    current_spent = query.scalar() or 0.0
-    percentage_used = (current_spent / budget.amount * 100) if budget.amount > 0 else 0.0
-    remaining_amount = budget.amount - current_spent
-    
-    # Calculate days remaining
-    now = datetime.utcnow()
-    if now > end_date:
-        days_remaining = 0
-    else:
-        days_remaining = (end_date - now).days
-    
-    return {
-        "current_spent": current_spent,
-        "percentage_used": percentage_used,
-        "remaining_amount": remaining_amount,
-        "days_remaining": days_remaining
-    }
+        for budget in budgets
+    ]
 
 @router.post("/budgets", response_model=BudgetResponse)
 def create_budget(
@@ -124,13 +137,18 @@ def create_budget(
         user_id=current_user.id
     )
     db.add(db_budget)
-    db.commit()
-    db.refresh(db_budget)
+    db.flush()
     
     # Load category relationship
     if db_budget.category_id:
         db_budget.category = category
     
+    # Start the budget's spend ledger
+    refresh_budget_spend(db, [db_budget])
+    bump_data_version(db, current_user.id)
+    db.commit()
+    db.refresh(db_budget)
+    
     # Calculate initial usage
     usage = calculate_budget_usage(db_budget, db)
     for key, value in usage.items():
@@ -138,7 +156,11 @@ def create_budget(
     
     return db_budget
 
-@router.get("/budgets", response_model=List[BudgetWithUsage])
+@router.get(
+    "/budgets",
+    response_model=List[BudgetWithUsage],
+    dependencies=[Depends(conditional_get(per_day=True))]
+)
 def get_budgets(
     is_active: Optional[bool] = Query(None),
     period: Optional[str] = Query(None),
@@ -154,26 +176,16 @@ def get_budgets(
     if period:
         query = query.filter(Budget.period == period)
     
-    budgets = query.all()
-    
-    # Calculate usage for each budget
-    budget_responses = []
-    for budget in budgets:
-        # Load category if exists
-        if budget.category_id:
-            budget.category = db.query(Category).filter(Category.id == budget.category_id).first()
-        
-        # Calculate usage
-        usage = calculate_budget_usage(budget, db)
-        
-        # Create response with usage
-        budget_dict = budget.__dict__.copy()
-        budget_dict.update(usage)
-        budget_responses.append(BudgetWithUsage(**budget_dict))
+    budgets = query.options(joinedload(Budget.category), joinedload(Budget.spend)).all()
     
-    return budget_responses
+    # Calculate usage for all budgets at once
+    return _with_usage(budgets, db)
 
-@router.get("/budgets/by-period", response_model=List[BudgetWithUsage])
+@router.get(
+    "/budgets/by-period",
+    response_model=List[BudgetWithUsage],
+    dependencies=[Depends(conditional_get(per_day=True))]
+)
 def get_budgets_by_period(
     year: int = Query(..., description="Year for the budget period"),
     month: int = Query(..., ge=1, le=12, description="Month for the budget period"),
@@ -196,24 +208,67 @@ def get_budgets_by_period(
                 Budget.end_date >= period_start
             )
         )
-    ).all()
+    ).options(joinedload(Budget.category), joinedload(Budget.spend)).all()
     
-    # Calculate usage for each budget
-    budget_responses = []
-    for budget in budgets:
-        # Load category if exists
-        if budget.category_id:
-            budget.category = db.query(Category).filter(Category.id == budget.category_id).first()
-        
-        # Calculate usage
-        usage = calculate_budget_usage(budget, db)
-        
-        # Create response with usage
-        budget_dict = budget.__dict__.copy()
-        budget_dict.update(usage)
-        budget_responses.append(BudgetWithUsage(**budget_dict))
+    # Calculate usage for all budgets at once
+    return _with_usage(budgets, db)
+
+@router.get(
+    "/budgets/history",
+    response_model=List[BudgetHistory],
+    dependencies=[Depends(conditional_get(per_day=True))]
+)
+def get_budgets_history(
+    periods: int = Query(12, ge=1, le=MAX_HISTORY_PERIODS, description="Number of periods, ending with the current one"),
+    is_active: Optional[bool] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get spending per period over the last `periods` periods of every budget"""
+    query = db.query(Budget).filter(Budget.user_id == current_user.id)
     
-    return budget_responses
+    if is_active is not None:
+        query = query.filter(Budget.is_active == is_active)
+    
+    budgets = query.order_by(Budget.id).all()
+    return _with_history(budgets, periods, db)
+
+@router.get("/budgets/alerts")
+def get_budget_alerts(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get budgets that have exceeded their alert threshold. Alerts are recorded by
+    the writes that change a budget's spend or settings; this reads the open
+    ones in one query.
+    """
+    rows = db.query(BudgetAlert, Budget.name, Category.name).join(
+        Budget, Budget.id == BudgetAlert.budget_id
+    ).outerjoin(
+        Category, Category.id == Budget.category_id
+    ).filter(
+        and_(
+            BudgetAlert.user_id == current_user.id,
+            BudgetAlert.resolved_at.is_(None)
+        )
+    ).order_by(BudgetAlert.triggered_at, BudgetAlert.id).all()
+    
+    now = datetime.utcnow()
+    return [
+        {
+            "budget_id": alert.budget_id,
+            "budget_name": budget_name,
+            "category": category_name,
+            "amount": alert.budget_amount,
+            "current_spent": alert.spent,
+            "percentage_used": alert.percentage_used,
+            "alert_threshold": alert.threshold,
+            "days_remaining": 0 if now > alert.window_end else (alert.window_end - now).days,
+            "triggered_at": alert.triggered_at
+        }
+        for alert, budget_name, category_name in rows
+    ]
 
 @router.get("/budgets/{budget_id}", response_model=BudgetWithUsage)
 def get_budget(
@@ -227,23 +282,36 @@ def get_budget(
             Budget.id == budget_id,
             Budget.user_id == current_user.id
         )
-    ).first()
+    ).options(joinedload(Budget.category), joinedload(Budget.spend)).first()
     
     if not budget:
         raise HTTPException(status_code=404, detail="Budget not found")
     
-    # Load category if exists
-    if budget.category_id:
-        budget.category = db.query(Category).filter(Category.id == budget.category_id).first()
-    
-    # Calculate usage
-    usage = calculate_budget_usage(budget, db)
+    return _with_usage([budget], db)[0]
+
+@router.get(
+    "/budgets/{budget_id}/history",
+    response_model=BudgetHistory,
+    dependencies=[Depends(conditional_get(per_day=True))]
+)
+def get_budget_history(
+    budget_id: int,
+    periods: int = Query(12, ge=1, le=MAX_HISTORY_PERIODS, description="Number of periods, ending with the current one"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get spending per period over the last `periods` periods of a budget"""
+    budget = db.query(Budget).filter(
+        and_(
+            Budget.id == budget_id,
+            Budget.user_id == current_user.id
+        )
+    ).first()
     
-    # Create response with usage
-    budget_dict = budget.__dict__.copy()
-    budget_dict.update(usage)
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
     
-    return BudgetWithUsage(**budget_dict)
+    return _with_history([budget], periods, db)[0]
 
 @router.put("/budgets/{budget_id}", response_model=BudgetResponse)
 def update_budget(
@@ -280,6 +348,17 @@ def update_budget(
     for field, value in update_data.items():
         setattr(budget, field, value)
     
+    # A new window or category invalidates the spend ledger, which also
+    # re-evaluates the budget's alerts
+    if update_data.keys() & {"period", "end_date", "category_id"}:
+        db.flush()
+        db.expire(budget, ["category"])
+        refresh_budget_spend(db, [budget])
+    elif update_data.keys() & {"amount", "alert_threshold", "is_active"}:
+        db.flush()
+        evaluate_budget_alerts(db, [current_user.id], [budget.id])
+    
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(budget)
     
@@ -311,42 +390,9 @@ def delete_budget(
     if not budget:
         raise HTTPException(status_code=404, detail="Budget not found")
     
+    record_deletions(db, current_user.id, "budget", [budget.id])
     db.delete(budget)
+    bump_data_version(db, current_user.id)
     db.commit()
     
     return {"message": "Budget deleted successfully"}
-
-@router.get("/budgets/alerts")
-def get_budget_alerts(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get budgets that have exceeded their alert threshold"""
-    active_budgets = db.query(Budget).filter(
-        and_(
-            Budget.user_id == current_user.id,
-            Budget.is_active == True
-        )
-    ).all()
-    
-    alerts = []
-    for budget in active_budgets:
-        usage = calculate_budget_usage(budget, db)
-        
-        if usage["percentage_used"] >= budget.alert_threshold:
-            # Load category if exists
-            if budget.category_id:
-                budget.category = db.query(Category).filter(Category.id == budget.category_id).first()
-            
-            alerts.append({
-                "budget_id": budget.id,
-                "budget_name": budget.name,
-                "category": budget.category.name if budget.category else None,
-                "amount": budget.amount,
-                "current_spent": usage["current_spent"],
-                "percentage_used": usage["percentage_used"],
-                "alert_threshold": budget.alert_threshold,
-                "days_remaining": usage["days_remaining"]
-            })
-    
-    return alerts
\ No newline at end of file
@@ -6,6 +6,9 @@ from models import (
     SessionLocal, User, Transaction
 )
 from auth import get_current_user
+from sync_utils import record_deletions
+from etag_utils import bump_data_version, conditional_get
+from category_utils import link_category_ids, rename_category
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
@@ -16,7 +19,7 @@ def get_db():
     finally:
         db.close()
 
-@router.get("/", response_model=List[CategoryResponse])
+@router.get("/", response_model=List[CategoryResponse], dependencies=[Depends(conditional_get())])
 async def get_categories(
     category_type: Optional[str] = None,
     current_user: User = Depends(get_current_user),
@@ -80,6 +83,10 @@ async def create_category(
         **category.dict()
     )
     db.add(db_category)
+    db.flush()
+    # Transactions already filed under this name now belong to the category
+    link_category_ids(db, Transaction.user_id == current_user.id)
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(db_category)
     
@@ -119,9 +126,15 @@ async def update_category(
                 detail=f"Category '{category_update.name}' of type '{category.type}' already exists"
             )
     
+    old_name = category.name
     for field, value in category_update.dict(exclude_unset=True).items():
         setattr(category, field, value)
     
+    if category.name != old_name:
+        db.flush()
+        rename_category(db, category, old_name)
+    
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(category)
     
@@ -147,6 +160,7 @@ async def delete_category(
     
     # Check if category is in use by any transactions
     transaction_count = db.query(Transaction).filter(
+        Transaction.user_id == current_user.id,
         Transaction.category_id == category_id
     ).count()
     
@@ -156,7 +170,11 @@ async def delete_category(
             detail=f"Cannot delete category. It is used by {transaction_count} transactions."
         )
     
+    # Budgets of the category are deleted with it
+    record_deletions(db, current_user.id, "budget", [budget.id for budget in category.budgets])
+    record_deletions(db, current_user.id, "category", [category.id])
     db.delete(category)
+    bump_data_version(db, current_user.id)
     db.commit()
     
     return {"message": "Category deleted successfully"}
@@ -228,6 +246,9 @@ async def initialize_default_categories(
         db.add(category)
         created_categories.append(category)
     
+    db.flush()
+    link_category_ids(db, Transaction.user_id == current_user.id)
+    bump_data_version(db, current_user.id)
     db.commit()
     
     return {
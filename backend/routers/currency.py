@@ -11,6 +11,9 @@ from models import SessionLocal, User, Transaction, Budget, CurrencyConversion
 from auth import get_current_user
 from currency_utils import get_exchange_rates, convert_currency, get_currency_symbol
 from currencies import CURRENCIES
+from etag_utils import bump_data_version
+from rollups import refresh_rollups
+from budget_spend import refresh_user_budget_spend
 
 router = APIRouter(prefix="/currency")
 
@@ -150,6 +153,7 @@ async def process_currency_conversion(
     db: Session
 ):
     """Background task to process currency conversion"""
+    conversion = None
     try:
         # Get conversion record
         conversion = db.query(CurrencyConversion).filter(
@@ -168,6 +172,7 @@ async def process_currency_conversion(
         old_currency = user.currency
         user.currency = target_currency
         user.currency_symbol = get_currency_symbol(target_currency)
+        bump_data_version(db, user_id)
         db.commit()
         
         # Get exchange rates
@@ -215,6 +220,7 @@ async def process_currency_conversion(
             if i % 10 == 0:
                 conversion.items_converted = i + 1
                 conversion.progress = int((i + 1) / total_items * 70)  # 70% for transactions
+                bump_data_version(db, user_id)
                 db.commit()
                 
                 # Update global progress (for WebSocket)
@@ -237,12 +243,18 @@ async def process_currency_conversion(
                 rates
             )
         
+        # Amounts changed, so recompute the user's monthly rollups and budget spend
+        db.flush()
+        refresh_rollups(db, [user_id])
+        refresh_user_budget_spend(db, [user_id])
+        
         # Mark as completed
         conversion.status = "completed"
         conversion.progress = 100
         conversion.items_converted = total_items
         conversion.completed_at = datetime.utcnow()
         conversion.revertable_until = datetime.utcnow() + timedelta(hours=24)
+        bump_data_version(db, user_id)
         db.commit()
         
         # Update global progress
@@ -254,10 +266,22 @@ async def process_currency_conversion(
         }
         
     except Exception as e:
+        # Discard the failed batch; batches committed before it stay converted
+        db.rollback()
+        
         # Mark as failed
         if conversion:
+            try:
+                # Bring the rollups and budget spend in line with the committed amounts
+                refresh_rollups(db, [user_id])
+                refresh_user_budget_spend(db, [user_id])
+            except Exception as refresh_error:
+                db.rollback()
+                print(f"Error refreshing rollups and budget spend after failed conversion {conversion_id}: {refresh_error}")
             conversion.status = "failed"
             conversion.error_message = str(e)
+            # Batches committed before the failure changed the user's data
+            bump_data_version(db, user_id)
             db.commit()
         
         conversion_progress[conversion_id] = {
@@ -0,0 +1,116 @@
+from datetime import timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session, joinedload
+
+from models import (
+    SessionLocal,
+    Transaction,
+    Category,
+    Budget,
+    DeletedRecord,
+    TransactionResponse,
+    CategoryResponse,
+    BudgetResponse,
+    SyncDeleted,
+    SyncResponse,
+    User
+)
+from auth import get_current_user
+from sql_utils import db_now
+from sync_utils import SYNC_TOMBSTONE_RETENTION_DAYS, encode_sync_cursor, decode_sync_cursor
+
+router = APIRouter()
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _changes(query, model, position, limit):
+    """
+    Up to `limit` rows of `query` after `position` in (sync_seq, id) order.
+    Returns (rows, new position, whether more rows are waiting).
+
+    sync_seq is stamped in commit order, so a row committed after this read
+    always sorts after the position returned and no settling delay is needed.
+    """
+    position = position or (0, 0)
+    rows = query.filter(
+        tuple_(model.sync_seq, model.id) > tuple_(position[0], position[1])
+    ).order_by(model.sync_seq, model.id).limit(limit + 1).all()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        position = (rows[-1].sync_seq, rows[-1].id)
+    return rows, position, more
+
+@router.get("/sync", response_model=SyncResponse)
+def sync_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=2000, description="Maximum rows per entity type"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Transactions, categories and budgets changed since the `since` cursor, plus the
+    ids of rows deleted since then. Omit `since` for a full initial sync.
+
+    Each stream is read as an index range scan on (user_id, sync_seq, id).
+    While `has_more` is true, call again with `next_cursor` straight away.
+    """
+    try:
+        positions, issued_at = decode_sync_cursor(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+
+    now = db_now(db)
+    if issued_at and issued_at < now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS):
+        raise HTTPException(status_code=410, detail="Sync cursor expired, start a full sync")
+    # Read before the streams: every change up to this version is visible to them
+    data_version = db.scalar(select(User.data_version).where(User.id == current_user.id))
+
+    transactions, positions["transactions"], more_transactions = _changes(
+        db.query(Transaction).filter(Transaction.user_id == current_user.id),
+        Transaction, positions.get("transactions"), limit
+    )
+    categories, positions["categories"], more_categories = _changes(
+        db.query(Category).filter(Category.user_id == current_user.id),
+        Category, positions.get("categories"), limit
+    )
+    budgets, positions["budgets"], more_budgets = _changes(
+        db.query(Budget).options(joinedload(Budget.category)).filter(Budget.user_id == current_user.id),
+        Budget, positions.get("budgets"), limit
+    )
+
+    deleted = SyncDeleted()
+    if since:
+        # A full sync has nothing to delete
+        tombstones, positions["deleted"], more_deleted = _changes(
+            db.query(DeletedRecord).filter(DeletedRecord.user_id == current_user.id),
+            DeletedRecord, positions.get("deleted"), limit
+        )
+        for tombstone in tombstones:
+            getattr(deleted, {
+                "transaction": "transactions",
+                "category": "categories",
+                "budget": "budgets"
+            }[tombstone.entity]).append(tombstone.entity_id)
+    else:
+        # Tombstones up to data_version delete nothing the full sync returned
+        positions["deleted"] = (data_version + 1, 0)
+        more_deleted = False
+
+    return SyncResponse(
+        transactions=[TransactionResponse.model_validate(t) for t in transactions],
+        categories=[CategoryResponse.model_validate(c) for c in categories],
+        budgets=[BudgetResponse.model_validate(b) for b in budgets],
+        deleted=deleted,
+        next_cursor=encode_sync_cursor(positions, now),
+        has_more=more_transactions or more_categories or more_budgets or more_deleted
+    )
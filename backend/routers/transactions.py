@@ -1,9 +1,10 @@
 from typing import List, Optional
-import json
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, extract
+from sqlalchemy import Text, and_, func, extract, cast, case, delete, distinct, insert, literal, null, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.sql import text
 import csv
 import io
@@ -11,17 +12,67 @@ import io
 from models import (
     SessionLocal, 
     Transaction, 
+    TransactionRollup,
     TransactionCreate,
     TransactionUpdate, 
     TransactionResponse, 
     TransactionFilter,
     TransactionStatistics,
+    TransactionSummary,
+    TransactionHeatmap,
+    TransactionTrends,
+    TransactionAggregate,
     BulkTransactionOperation,
     PaginatedTransactionResponse,
+    TransactionBatchCreate,
+    TransactionBatchResult,
+    TransactionBatchResponse,
+    RecurringOccurrence,
     User
 )
 from auth import get_current_user
-from currency_utils import get_historical_exchange_rate
+from currency_utils import get_historical_exchange_rate, get_historical_exchange_rates
+from sql_utils import id_in, month_key
+from rollups import (
+    record_transaction,
+    month_of,
+    add_delta,
+    add_group_delta,
+    apply_rollup_deltas,
+    group_totals,
+    is_month_aligned
+)
+from budget_spend import add_spend_delta, add_spend_rows, apply_spend_deltas, record_spend, spend_totals
+from sync_utils import record_deletions
+from category_utils import category_id_for, category_ids
+from recurring import FREQUENCY_STEPS, TEMPLATE_COLUMNS, upcoming_occurrences
+from analytics import (
+    AGGREGATE_DIMENSIONS,
+    AGGREGATE_MEASURES,
+    MAX_BUCKETS,
+    aggregate,
+    as_bucket_date,
+    bucket_count,
+    bucket_key,
+    bucket_series,
+    bucket_starts,
+    cached_for_version,
+    columnar_series,
+    moving_averages,
+    period_deltas
+)
+from etag_utils import bump_data_version, conditional_get, etag_headers
+from serializers import FastJSONResponse, TRANSACTION_COLUMNS, transaction_dicts
+from search_utils import search_condition, search_relevance, tags_condition
+from pagination import (
+    encode_cursor,
+    decode_cursor,
+    apply_keyset,
+    filter_hash,
+    cached_exact_count,
+    capped_count,
+    estimated_count
+)
 
 router = APIRouter()
 
@@ -40,9 +91,6 @@ async def create_transaction(
     current_user: User = Depends(get_current_user)
 ):
     """Create a new transaction for the current user."""
-    # Convert tags list to JSON string for storage
-    tags_json = json.dumps(transaction.tags) if transaction.tags else None
-    
     # Get the exchange rate to USD at the time of transaction
     transaction_currency = current_user.currency
     exchange_rate_to_usd = 1.0
@@ -58,29 +106,144 @@ async def create_transaction(
     # Store original amount and currency for future conversions
     db_transaction = Transaction(
         **transaction.dict(exclude={'tags'}),
-        tags=tags_json,
+        tags=transaction.tags or None,
         user_id=current_user.id,
         original_amount=transaction.amount,
         original_currency=transaction_currency,
         exchange_rate_to_usd=exchange_rate_to_usd
     )
+    # The category is named by the client; its id is resolved here
+    db_transaction.category_id = category_id_for(db, current_user.id, transaction.category, transaction.type)
     db.add(db_transaction)
+    record_transaction(db, db_transaction)
+    record_spend(db, db_transaction)
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(db_transaction)
     
-    # Convert tags back to list for response
-    if db_transaction.tags:
-        db_transaction.tags = json.loads(db_transaction.tags)
-    
     return db_transaction
 
-@router.get("/transactions", response_model=List[TransactionResponse])
-def read_transactions(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000),
-    sort_by: str = Query("date", regex="^(date|amount|created_at)$"),
-    sort_order: str = Query("desc", regex="^(asc|desc)$"),
-    # Filter parameters
+# Largest accepted POST /transactions/batch payload
+MAX_BATCH_ITEMS = 1000
+
+@router.post("/transactions/batch", response_model=TransactionBatchResponse)
+async def create_transactions_batch(
+    batch: TransactionBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Create many transactions in one request (e.g. entries recorded offline).
+
+    Exchange rates are resolved once per distinct date and new rows are written
+    with a single bulk INSERT and one commit. Items carrying an idempotency_key
+    that was already used are not inserted again; the existing transaction is
+    returned with status "duplicate". Results are in request order.
+    """
+    if len(batch.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ITEMS} items per batch")
+    
+    results = [
+        TransactionBatchResult(index=index, status="created", idempotency_key=item.idempotency_key)
+        for index, item in enumerate(batch.items)
+    ]
+    
+    keys = {item.idempotency_key for item in batch.items if item.idempotency_key}
+    existing = {}
+    if keys:
+        existing = {
+            t.idempotency_key: t for t in db.query(Transaction).filter(
+                and_(Transaction.user_id == current_user.id, Transaction.idempotency_key.in_(keys))
+            )
+        }
+    
+    # index of the item that creates a key, for later items repeating it
+    first_with_key = {}
+    pending = []
+    for index, item in enumerate(batch.items):
+        key = item.idempotency_key
+        if key in existing or key in first_with_key:
+            results[index].status = "duplicate"
+        elif item.type not in ("income", "expense"):
+            results[index].status = "error"
+            results[index].error = f"Invalid type: {item.type}"
+        else:
+            if key:
+                first_with_key[key] = index
+            pending.append(index)
+    
+    created = {}
+    if pending:
+        transaction_currency = current_user.currency
+        rates_by_date = await get_historical_exchange_rates(
+            transaction_currency, "USD", (batch.items[index].date for index in pending)
+        )
+        
+        ids_by_category = category_ids(
+            db, current_user.id, ((batch.items[index].category, batch.items[index].type) for index in pending)
+        )
+        rows = []
+        rollup_deltas = {}
+        spend_deltas = {}
+        for index in pending:
+            item = batch.items[index]
+            rows.append({
+                **item.dict(exclude={'tags', 'idempotency_key'}),
+                'category_id': ids_by_category.get((item.category, item.type)),
+                'tags': item.tags or None,
+                'idempotency_key': item.idempotency_key,
+                'user_id': current_user.id,
+                'original_amount': item.amount,
+                'original_currency': transaction_currency,
+                'exchange_rate_to_usd': rates_by_date[item.date.date()]
+            })
+            add_delta(rollup_deltas, item.date, item.type, item.category, item.amount)
+            add_spend_delta(
+                spend_deltas, item.date, item.type, ids_by_category.get((item.category, item.type)), item.amount
+            )
+        
+        try:
+            # Core insert on the table: one multi-row statement (the ORM bulk path
+            # splits batches whenever the tags column mixes NULL and arrays)
+            table = Transaction.__table__
+            inserted = db.execute(
+                insert(table).returning(*table.c, sort_by_parameter_order=True),
+                rows
+            ).all()
+        except IntegrityError:
+            # A concurrent request claimed one of the keys first
+            db.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Idempotency key already in use by a concurrent request, retry the batch"
+            )
+        apply_rollup_deltas(db, current_user.id, rollup_deltas)
+        apply_spend_deltas(db, current_user.id, spend_deltas)
+        created = dict(zip(pending, inserted))
+    
+    # Serialize before committing, which would expire the loaded rows
+    for index, item in enumerate(batch.items):
+        result = results[index]
+        if result.status == "created":
+            result.transaction = TransactionResponse.model_validate(created[index])
+        elif result.status == "duplicate":
+            key = item.idempotency_key
+            original = existing.get(key) or created[first_with_key[key]]
+            result.transaction = TransactionResponse.model_validate(original)
+    
+    if created:
+        bump_data_version(db, current_user.id)
+        db.commit()
+    
+    return TransactionBatchResponse(
+        results=results,
+        created=len(created),
+        duplicates=sum(result.status == "duplicate" for result in results),
+        errors=sum(result.status == "error" for result in results)
+    )
+
+def _apply_transaction_filters(
+    query,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     type: Optional[str] = None,
@@ -89,14 +252,9 @@ def read_transactions(
     max_amount: Optional[float] = None,
     payment_method: Optional[str] = None,
     search: Optional[str] = None,
-    tags: Optional[str] = None,  # Comma-separated tags
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    tags: Optional[str] = None
 ):
-    """Get filtered and paginated transactions for the current user."""
-    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
-    
-    # Apply filters
+    """Apply the shared list filters to a transaction query."""
     if start_date:
         query = query.filter(Transaction.date >= start_date)
     if end_date:
@@ -112,40 +270,85 @@ def read_transactions(
     if payment_method:
         query = query.filter(Transaction.payment_method == payment_method)
     if search:
-        query = query.filter(
-            or_(
-                Transaction.description.ilike(f"%{search}%"),
-                Transaction.location.ilike(f"%{search}%"),
-                Transaction.category.ilike(f"%{search}%")
-            )
-        )
+        query = query.filter(search_condition(search))
     if tags:
-        tag_list = tags.split(",")
-        for tag in tag_list:
-            query = query.filter(Transaction.tags.like(f'%"{tag.strip()}"%'))
-    
-    # Apply sorting
-    order_column = getattr(Transaction, sort_by)
-    if sort_order == "desc":
-        query = query.order_by(order_column.desc())
-    else:
-        query = query.order_by(order_column.asc())
+        tag_list = [tag.strip() for tag in tags.split(",")]
+        query = query.filter(tags_condition(query.session, tag_list))
+    return query
+
+def _apply_sorting(query, sort_by: str, sort_order: str, cursor: Optional[str] = None):
+    """Order by (sort column, id) and seek past the cursor position if one is given."""
+    cursor_position = None
+    if cursor:
+        try:
+            cursor_position = decode_cursor(cursor, sort_by, sort_order)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return apply_keyset(query, getattr(Transaction, sort_by), Transaction.id, sort_order, cursor_position)
+
+def _next_cursor(transactions: list, limit: int, sort_by: str, sort_order: str) -> Optional[str]:
+    """
+    Build the cursor for the page after `transactions` (ORM objects or column rows),
+    or None if this was the last page.
+    """
+    if len(transactions) <= limit:
+        return None
+    last = transactions[limit - 1]
+    return encode_cursor(sort_by, sort_order, getattr(last, sort_by), last.id)
+
+@router.get("/transactions", response_model=List[TransactionResponse])
+def read_transactions(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor; replaces skip"),
+    sort_by: str = Query("date", regex="^(date|amount|created_at)$"),
+    sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    # Filter parameters
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    payment_method: Optional[str] = None,
+    search: Optional[str] = None,
+    tags: Optional[str] = None,  # Comma-separated tags
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    etag: str = Depends(conditional_get())
+):
+    """Get filtered and paginated transactions for the current user."""
+    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
+    
+    # Apply filters
+    query = _apply_transaction_filters(
+        query, start_date, end_date, type, category,
+        min_amount, max_amount, payment_method, search, tags
+    )
     
-    # Execute query
-    transactions = query.offset(skip).limit(limit).all()
+    # Apply sorting (and seek past the cursor in cursor mode)
+    query = _apply_sorting(query, sort_by, sort_order, cursor)
+    if not cursor:
+        query = query.offset(skip)
     
-    # Convert tags back to list for each transaction
-    for transaction in transactions:
-        if transaction.tags:
-            transaction.tags = json.loads(transaction.tags)
+    # Fetch one extra row to know whether another page exists
+    rows = query.with_entities(*TRANSACTION_COLUMNS).limit(limit + 1).all()
+    next_cursor = _next_cursor(rows, limit, sort_by, sort_order)
     
-    return transactions
+    # Rows are serialized directly; response_model only documents the schema
+    headers = etag_headers(etag)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return FastJSONResponse(transaction_dicts(rows[:limit]), headers=headers)
 
 
 @router.get("/transactions/paginated", response_model=PaginatedTransactionResponse)
 def read_transactions_paginated(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; replaces page"),
+    count_mode: str = Query("exact", regex="^(exact|capped|estimate)$", description="How `total` is computed"),
+    count_cap: int = Query(1000, ge=1, le=100000, description="Upper bound for count_mode=capped"),
     sort_by: str = Query("date", regex="^(date|amount|created_at)$"),
     sort_order: str = Query("desc", regex="^(asc|desc)$"),
     # Filter parameters
@@ -159,68 +362,57 @@ def read_transactions_paginated(
     search: Optional[str] = None,
     tags: Optional[str] = None,  # Comma-separated tags
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    etag: str = Depends(conditional_get())
 ):
     """Get paginated transactions with total count."""
     query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
     
     # Apply filters (same as above)
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
-    if type:
-        query = query.filter(Transaction.type == type)
-    if category:
-        query = query.filter(Transaction.category == category)
-    if min_amount is not None:
-        query = query.filter(Transaction.amount >= min_amount)
-    if max_amount is not None:
-        query = query.filter(Transaction.amount <= max_amount)
-    if payment_method:
-        query = query.filter(Transaction.payment_method == payment_method)
-    if search:
-        query = query.filter(
-            or_(
-                Transaction.description.ilike(f"%{search}%"),
-                Transaction.location.ilike(f"%{search}%"),
-                Transaction.category.ilike(f"%{search}%")
-            )
-        )
-    if tags:
-        tag_list = tags.split(",")
-        for tag in tag_list:
-            query = query.filter(Transaction.tags.like(f'%"{tag.strip()}"%'))
+    query = _apply_transaction_filters(
+        query, start_date, end_date, type, category,
+        min_amount, max_amount, payment_method, search, tags
+    )
     
     # Get total count before pagination
-    total = query.count()
+    total, total_exact = None, True
+    if count_mode == "estimate":
+        total = estimated_count(db, query)
+        total_exact = False
+    if count_mode == "capped" or (count_mode == "estimate" and total is None):
+        # Databases without planner estimates fall back to a capped count
+        total, total_exact = capped_count(query, count_cap)
+    if count_mode == "exact":
+        filters_key = filter_hash({
+            "start_date": start_date, "end_date": end_date, "type": type,
+            "category": category, "min_amount": min_amount, "max_amount": max_amount,
+            "payment_method": payment_method, "search": search, "tags": tags
+        })
+        total = cached_exact_count(query, current_user.id, current_user.data_version, filters_key)
     
-    # Apply sorting
-    order_column = getattr(Transaction, sort_by)
-    if sort_order == "desc":
-        query = query.order_by(order_column.desc())
-    else:
-        query = query.order_by(order_column.asc())
+    # Apply sorting (and seek past the cursor in cursor mode)
+    query = _apply_sorting(query, sort_by, sort_order, cursor)
     
     # Calculate pagination
-    skip = (page - 1) * page_size
-    transactions = query.offset(skip).limit(page_size).all()
-    
-    # Convert tags back to list for each transaction
-    for transaction in transactions:
-        if transaction.tags:
-            transaction.tags = json.loads(transaction.tags)
+    if not cursor:
+        skip = (page - 1) * page_size
+        query = query.offset(skip)
+    rows = query.with_entities(*TRANSACTION_COLUMNS).limit(page_size + 1).all()
+    next_cursor = _next_cursor(rows, page_size, sort_by, sort_order)
     
     # Calculate total pages
     total_pages = (total + page_size - 1) // page_size
     
-    return PaginatedTransactionResponse(
-        items=transactions,
-        total=total,
-        page=page,
-        page_size=page_size,
-        total_pages=total_pages
-    )
+    # Same shape as PaginatedTransactionResponse, without per-row validation
+    return FastJSONResponse({
+        "items": transaction_dicts(rows[:page_size]),
+        "total": total,
+        "total_exact": total_exact,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": total_pages,
+        "next_cursor": next_cursor
+    }, headers=etag_headers(etag))
 
 @router.get("/transactions/search", response_model=List[TransactionResponse])
 def search_transactions(
@@ -229,28 +421,28 @@ def search_transactions(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Quick search transactions by description, location, or category."""
+    """Quick search transactions by description, location, or category, best matches first."""
     query = db.query(Transaction).filter(
         and_(
             Transaction.user_id == current_user.id,
-            or_(
-                Transaction.description.ilike(f"%{q}%"),
-                Transaction.location.ilike(f"%{q}%"),
-                Transaction.category.ilike(f"%{q}%")
-            )
+            search_condition(q)
         )
-    ).order_by(Transaction.date.desc()).limit(limit)
-    
-    transactions = query.all()
+    )
     
-    # Convert tags back to list
-    for transaction in transactions:
-        if transaction.tags:
-            transaction.tags = json.loads(transaction.tags)
+    relevance = search_relevance(db, q)
+    if relevance is not None:
+        query = query.order_by(relevance.desc(), Transaction.date.desc())
+    else:
+        query = query.order_by(Transaction.date.desc())
+    query = query.limit(limit)
     
-    return transactions
+    return FastJSONResponse(transaction_dicts(query.with_entities(*TRANSACTION_COLUMNS)))
 
-@router.get("/transactions/statistics", response_model=TransactionStatistics)
+@router.get(
+    "/transactions/statistics",
+    response_model=TransactionStatistics,
+    dependencies=[Depends(conditional_get())]
+)
 def get_transaction_statistics(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
@@ -258,17 +450,43 @@ def get_transaction_statistics(
     current_user: User = Depends(get_current_user)
 ):
     """Get detailed statistics for transactions."""
-    # Base query
-    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
-    
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
-    
-    transactions = query.all()
-    
-    if not transactions:
+    def scoped(query):
+        query = query.filter(Transaction.user_id == current_user.id)
+        if start_date:
+            query = query.filter(Transaction.date >= start_date)
+        if end_date:
+            query = query.filter(Transaction.date <= end_date)
+        return query
+    
+    # Whole-month ranges are answered from the monthly rollups instead of raw rows
+    use_rollups = is_month_aligned(start_date, end_date)
+    
+    def scoped_rollups(query):
+        query = query.filter(TransactionRollup.user_id == current_user.id)
+        if start_date:
+            query = query.filter(TransactionRollup.month >= month_of(start_date))
+        if end_date:
+            query = query.filter(TransactionRollup.month <= month_of(end_date))
+        return query
+    
+    # Totals and category breakdowns from one grouped query
+    if use_rollups:
+        groups = scoped_rollups(db.query(
+            TransactionRollup.type,
+            TransactionRollup.category,
+            func.sum(TransactionRollup.total_amount),
+            func.sum(TransactionRollup.transaction_count)
+        )).group_by(TransactionRollup.type, TransactionRollup.category).all()
+    else:
+        groups = scoped(db.query(
+            Transaction.type,
+            Transaction.category,
+            func.sum(Transaction.amount),
+            func.count(Transaction.id)
+        )).group_by(Transaction.type, Transaction.category).all()
+    
+    transaction_count = sum(count for _, _, _, count in groups)
+    if transaction_count == 0:
         return TransactionStatistics(
             total_income=0,
             total_expenses=0,
@@ -282,67 +500,71 @@ def get_transaction_statistics(
         )
     
     # Calculate statistics
-    total_income = sum(t.amount for t in transactions if t.type == "income")
-    total_expenses = sum(t.amount for t in transactions if t.type == "expense")
-    
-    # Get largest transactions
-    expense_transactions = [t for t in transactions if t.type == "expense"]
-    income_transactions = [t for t in transactions if t.type == "income"]
-    
-    largest_expense = max(expense_transactions, key=lambda t: t.amount) if expense_transactions else None
-    largest_income = max(income_transactions, key=lambda t: t.amount) if income_transactions else None
-    
-    # Convert tags for largest transactions
-    if largest_expense and largest_expense.tags:
-        largest_expense.tags = json.loads(largest_expense.tags)
-    if largest_income and largest_income.tags:
-        largest_income.tags = json.loads(largest_income.tags)
+    total_income = sum(amount for type_, _, amount, _ in groups if type_ == "income")
+    total_expenses = sum(amount for type_, _, amount, _ in groups if type_ == "expense")
     
     # Calculate category breakdowns
     expenses_by_category = {}
     income_by_category = {}
     
-    for t in transactions:
-        if t.type == "expense":
-            expenses_by_category[t.category] = expenses_by_category.get(t.category, 0) + t.amount
+    for type_, category, amount, _ in groups:
+        if type_ == "expense":
+            expenses_by_category[category] = expenses_by_category.get(category, 0) + amount
         else:
-            income_by_category[t.category] = income_by_category.get(t.category, 0) + t.amount
+            income_by_category[category] = income_by_category.get(category, 0) + amount
+    
+    # Get largest transactions
+    def largest(type_):
+        return scoped(db.query(Transaction)).filter(
+            Transaction.type == type_
+        ).order_by(Transaction.amount.desc(), Transaction.id).first()
+    
+    largest_expense = largest("expense")
+    largest_income = largest("income")
     
     # Calculate daily average
-    if transactions:
-        date_range = (max(t.date for t in transactions) - min(t.date for t in transactions)).days + 1
-        daily_average = (total_income - total_expenses) / date_range if date_range > 0 else 0
-    else:
-        daily_average = 0
+    first_date, last_date = scoped(db.query(func.min(Transaction.date), func.max(Transaction.date))).one()
+    date_range = (last_date - first_date).days + 1
+    daily_average = (total_income - total_expenses) / date_range if date_range > 0 else 0
     
     # Calculate monthly trend
-    monthly_trend = []
-    monthly_data = {}
+    if use_rollups:
+        is_income = TransactionRollup.type == "income"
+        monthly_rows = scoped_rollups(db.query(
+            TransactionRollup.month,
+            is_income,
+            func.sum(TransactionRollup.total_amount)
+        )).group_by(TransactionRollup.month, is_income).all()
+    else:
+        month = month_key(db, Transaction.date)
+        is_income = Transaction.type == "income"
+        monthly_rows = scoped(db.query(
+            month,
+            is_income,
+            func.sum(Transaction.amount)
+        )).group_by(month, is_income).all()
     
-    for t in transactions:
-        month_key = t.date.strftime("%Y-%m")
-        if month_key not in monthly_data:
-            monthly_data[month_key] = {"income": 0, "expenses": 0}
-        
-        if t.type == "income":
-            monthly_data[month_key]["income"] += t.amount
-        else:
-            monthly_data[month_key]["expenses"] += t.amount
+    monthly_data = {}
+    for month_label, income, amount in monthly_rows:
+        data = monthly_data.setdefault(month_label, {"income": 0, "expenses": 0})
+        data["income" if income else "expenses"] += amount
     
-    for month, data in sorted(monthly_data.items()):
-        monthly_trend.append({
-            "month": month,
+    monthly_trend = [
+        {
+            "month": month_label,
             "income": data["income"],
             "expenses": data["expenses"],
             "balance": data["income"] - data["expenses"]
-        })
+        }
+        for month_label, data in sorted(monthly_data.items())
+    ]
     
     return TransactionStatistics(
         total_income=total_income,
         total_expenses=total_expenses,
         balance=total_income - total_expenses,
-        transaction_count=len(transactions),
-        average_transaction=(total_income + total_expenses) / len(transactions) if transactions else 0,
+        transaction_count=transaction_count,
+        average_transaction=(total_income + total_expenses) / transaction_count,
         largest_expense=largest_expense,
         largest_income=largest_income,
         expenses_by_category=expenses_by_category,
@@ -351,6 +573,275 @@ def get_transaction_statistics(
         monthly_trend=monthly_trend
     )
 
+SUMMARY_SPLITS = {
+    "category": (Transaction.category, TransactionRollup.category),
+    "type": (Transaction.type, TransactionRollup.type),
+    "payment_method": (Transaction.payment_method, None),
+}
+
+@router.get("/transactions/summary", response_model=TransactionSummary)
+def get_transaction_summary(
+    bucket: str = Query("month", regex="^(day|week|month|year)$"),
+    split_by: Optional[str] = Query(None, regex="^(category|type|payment_method)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    etag: str = Depends(conditional_get())
+):
+    """
+    Income, expenses and transaction counts per day, week, month or year, optionally
+    split by category, type or payment method. Every bucket in the range is present,
+    empty ones included, and each series is a set of arrays parallel to `buckets`.
+    """
+    if start_date and end_date and end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    
+    # Whole-month ranges bucketed by month or year are answered from the monthly rollups
+    use_rollups = (
+        bucket in ("month", "year")
+        and (split_by is None or SUMMARY_SPLITS[split_by][1] is not None)
+        and is_month_aligned(start_date, end_date)
+    )
+    
+    if use_rollups:
+        scope = [TransactionRollup.user_id == current_user.id]
+        if start_date:
+            scope.append(TransactionRollup.month >= month_of(start_date))
+        if end_date:
+            scope.append(TransactionRollup.month <= month_of(end_date))
+        bounds = db.query(func.min(TransactionRollup.month), func.max(TransactionRollup.month))
+    else:
+        scope = [Transaction.user_id == current_user.id]
+        if start_date:
+            scope.append(Transaction.date >= start_date)
+        if end_date:
+            scope.append(Transaction.date <= end_date)
+        bounds = db.query(func.min(Transaction.date), func.max(Transaction.date))
+    
+    # Open ends of the range default to the first and last transaction
+    start, end = start_date, end_date
+    if start is None or end is None:
+        first, last = bounds.filter(*scope).one()
+        if first is None:
+            return FastJSONResponse(
+                {"bucket": bucket, "split_by": split_by, "buckets": [], "series": []},
+                headers=etag_headers(etag)
+            )
+        start = start or as_bucket_date(first)
+        end = end or as_bucket_date(last)
+    if bucket_count(start, end, bucket) > MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range spans more than {MAX_BUCKETS} {bucket} buckets; use a larger bucket"
+        )
+    
+    if use_rollups:
+        bucket_column = TransactionRollup.month if bucket == "month" else func.substr(TransactionRollup.month, 1, 4)
+        split = [SUMMARY_SPLITS[split_by][1]] if split_by else []
+        rows = db.query(
+            bucket_column,
+            split[0] if split else null(),
+            TransactionRollup.type,
+            func.sum(TransactionRollup.total_amount),
+            func.sum(TransactionRollup.transaction_count)
+        ).filter(*scope).group_by(bucket_column, *split, TransactionRollup.type).all()
+        buckets = bucket_starts(start, end, bucket)
+    else:
+        bucket_column = bucket_key(db, Transaction.date, bucket)
+        split = [SUMMARY_SPLITS[split_by][0]] if split_by else []
+        totals = select(
+            bucket_column.label("bucket"),
+            (split[0] if split else null()).label("key"),
+            Transaction.type.label("type"),
+            func.sum(Transaction.amount).label("amount"),
+            func.count(Transaction.id).label("count")
+        ).where(*scope).group_by(bucket_column, *split, Transaction.type).subquery()
+        
+        # Empty buckets are filled in SQL by outer-joining onto the bucket series
+        # (generate_series on PostgreSQL)
+        series = bucket_series(db, start, end, bucket)
+        rows = db.execute(
+            select(series.c.bucket, totals.c.key, totals.c.type, totals.c.amount, totals.c.count)
+            .select_from(series.outerjoin(totals, totals.c.bucket == series.c.bucket))
+            .order_by(series.c.bucket)
+        ).all()
+        buckets = list(dict.fromkeys(as_bucket_date(row.bucket) for row in rows))
+    
+    return FastJSONResponse({
+        "bucket": bucket,
+        "split_by": split_by,
+        "buckets": [bucket_start.isoformat() for bucket_start in buckets],
+        "series": columnar_series(buckets, rows)
+    }, headers=etag_headers(etag))
+
+@router.get("/transactions/heatmap", response_model=TransactionHeatmap)
+def get_transaction_heatmap(
+    year: Optional[int] = Query(None, ge=1970, le=2100, description="Calendar year (default: current year)"),
+    category: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    etag: str = Depends(conditional_get())
+):
+    """
+    Per-day income, expense and transaction count totals for a calendar year, from
+    one grouped query. Days are packed as parallel arrays starting on January 1.
+    """
+    year = year or datetime.utcnow().year
+    year_start = datetime(year, 1, 1)
+    next_year = datetime(year + 1, 1, 1)
+    
+    day = bucket_key(db, Transaction.date, "day")
+    query = db.query(
+        day,
+        null(),
+        Transaction.type,
+        func.sum(Transaction.amount),
+        func.count(Transaction.id)
+    ).filter(
+        and_(
+            Transaction.user_id == current_user.id,
+            Transaction.date >= year_start,
+            Transaction.date < next_year
+        )
+    )
+    if category:
+        query = query.filter(Transaction.category == category)
+    rows = query.group_by(day, Transaction.type).all()
+    
+    days = bucket_starts(year_start, next_year - timedelta(days=1), "day")
+    series = columnar_series(days, rows)
+    totals = series[0] if series else {
+        "income": [0.0] * len(days),
+        "expenses": [0.0] * len(days),
+        "count": [0] * len(days)
+    }
+    
+    return FastJSONResponse({
+        "year": year,
+        "start_date": year_start.date().isoformat(),
+        "days": len(days),
+        "category": category,
+        "income": totals["income"],
+        "expenses": totals["expenses"],
+        "count": totals["count"]
+    }, headers=etag_headers(etag))
+
+@router.get("/transactions/trends", response_model=TransactionTrends)
+def get_transaction_trends(
+    type: str = Query("expense", regex="^(income|expense)$"),
+    end_date: Optional[datetime] = Query(None, description="Last day covered (default: today)"),
+    days: int = Query(90, ge=1, le=366, description="Days of moving averages to return"),
+    months: int = Query(12, ge=1, le=60, description="Months of per-category deltas to return"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    etag: str = Depends(conditional_get(per_day=True))
+):
+    """
+    7, 30 and 90-day moving averages of daily totals, and month-over-month and
+    year-over-year deltas per category, computed with SQL window functions.
+    Results are cached until the user's data changes.
+    """
+    end = (end_date or datetime.utcnow()).date()
+    
+    def compute():
+        return {
+            "type": type,
+            "end_date": end.isoformat(),
+            **moving_averages(db, current_user.id, type, end, days),
+            **period_deltas(db, current_user.id, type, end, months)
+        }
+    
+    payload = cached_for_version(
+        current_user.id,
+        current_user.data_version,
+        f"trends:{type}:{end.isoformat()}:{days}:{months}",
+        compute
+    )
+    return FastJSONResponse(payload, headers=etag_headers(etag))
+
+def _parse_list(value: str, allowed, name: str) -> List[str]:
+    items = list(dict.fromkeys(item.strip() for item in value.split(",") if item.strip()))
+    invalid = [item for item in items if item not in allowed]
+    if invalid or not items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid {name} {', '.join(invalid) or repr(value)}; allowed: {', '.join(allowed)}"
+        )
+    return items
+
+@router.get("/transactions/aggregate", response_model=TransactionAggregate)
+def get_transaction_aggregate(
+    dimensions: str = Query(..., description="Comma-separated: type, category, payment_method, location, tag, date"),
+    measures: str = Query("sum,count", description="Comma-separated: sum, count, avg, min, max"),
+    totals: str = Query("none", regex="^(none|rollup|cube)$"),
+    bucket: str = Query("month", regex="^(day|week|month|year)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    etag: str = Depends(conditional_get())
+):
+    """
+    Transaction amounts grouped by any combination of whitelisted dimensions, with
+    optional ROLLUP or CUBE subtotals, compiled into a single GROUPING SETS query.
+    Results are cached until the user's data changes.
+    """
+    dimension_list = _parse_list(dimensions, AGGREGATE_DIMENSIONS, "dimensions")
+    measure_list = _parse_list(measures, list(AGGREGATE_MEASURES), "measures")
+    if start_date and end_date and end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    
+    def compute():
+        return aggregate(
+            db, current_user.id, dimension_list, measure_list, totals, bucket, start_date, end_date
+        )
+    
+    key = ":".join([
+        "aggregate", ",".join(dimension_list), ",".join(measure_list), totals, bucket,
+        start_date.isoformat() if start_date else "", end_date.isoformat() if end_date else ""
+    ])
+    payload = cached_for_version(current_user.id, current_user.data_version, key, compute)
+    return FastJSONResponse(payload, headers=etag_headers(etag))
+
+@router.get("/transactions/recurring", response_model=List[TransactionResponse])
+def get_recurring_transactions(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get all recurring transactions for the current user."""
+    rows = db.query(*TRANSACTION_COLUMNS).filter(
+        and_(
+            Transaction.user_id == current_user.id,
+            Transaction.is_recurring == True
+        )
+    ).order_by(Transaction.date.desc())
+    
+    return FastJSONResponse(transaction_dicts(rows))
+
+@router.get("/transactions/recurring/upcoming", response_model=List[RecurringOccurrence])
+def get_upcoming_recurring_transactions(
+    days: int = Query(30, ge=1, le=366, description="How far ahead to project"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upcoming occurrences of the current user's recurring transactions, earliest
+    first. Projected from the templates; nothing is written.
+    """
+    templates = db.execute(
+        select(*TEMPLATE_COLUMNS).where(
+            and_(
+                Transaction.user_id == current_user.id,
+                Transaction.is_recurring == True,
+                Transaction.recurring_frequency.in_(FREQUENCY_STEPS)
+            )
+        )
+    ).all()
+    until = datetime.utcnow() + timedelta(days=days)
+    return FastJSONResponse(upcoming_occurrences(templates, until, limit))
+
 @router.get("/transactions/{transaction_id}", response_model=TransactionResponse)
 def get_transaction(
     transaction_id: int,
@@ -368,9 +859,6 @@ def get_transaction(
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
-    if transaction.tags:
-        transaction.tags = json.loads(transaction.tags)
-    
     return transaction
 
 @router.put("/transactions/{transaction_id}", response_model=TransactionResponse)
@@ -394,10 +882,6 @@ async def update_transaction(
     # Update fields
     update_data = transaction_update.dict(exclude_unset=True)
     
-    # Handle tags conversion
-    if 'tags' in update_data and update_data['tags'] is not None:
-        update_data['tags'] = json.dumps(update_data['tags'])
-    
     # If amount or date is being updated, update exchange rate
     if 'amount' in update_data or 'date' in update_data:
         transaction_currency = current_user.currency
@@ -422,16 +906,22 @@ async def update_transaction(
         else:
             db_transaction.exchange_rate_to_usd = 1.0
     
+    # Move the transaction's contribution between rollup buckets and budgets
+    record_transaction(db, db_transaction, count=-1)
+    record_spend(db, db_transaction, count=-1)
     for field, value in update_data.items():
         setattr(db_transaction, field, value)
+    if 'category' in update_data or 'type' in update_data:
+        db_transaction.category_id = category_id_for(
+            db, current_user.id, db_transaction.category, db_transaction.type
+        )
+    record_transaction(db, db_transaction)
+    record_spend(db, db_transaction)
     
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(db_transaction)
     
-    # Convert tags back to list for response
-    if db_transaction.tags:
-        db_transaction.tags = json.loads(db_transaction.tags)
-    
     return db_transaction
 
 @router.delete("/transactions/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -451,122 +941,274 @@ def delete_transaction(
     if not db_transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
+    record_transaction(db, db_transaction, count=-1)
+    record_spend(db, db_transaction, count=-1)
+    record_deletions(db, current_user.id, "transaction", [db_transaction.id])
     db.delete(db_transaction)
+    bump_data_version(db, current_user.id)
     db.commit()
     return {"message": "Transaction deleted successfully"}
 
+def _add_tags(db: Session, condition, new_tags: List[str]):
+    """Merge tags into the selected transactions without duplicates, in one UPDATE on PostgreSQL."""
+    if db.bind.dialect.name == "postgresql":
+        merged = func.coalesce(Transaction.tags, func.jsonb_build_array()).op("||")(cast(new_tags, JSONB))
+        elements = func.jsonb_array_elements_text(merged).table_valued("value")
+        db.execute(
+            update(Transaction)
+            .where(condition)
+            .values(tags=select(func.jsonb_agg(distinct(elements.c.value))).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        return
+    
+    for transaction in db.query(Transaction).filter(condition):
+        # Add new tags without duplicates
+        transaction.tags = list(set((transaction.tags or []) + new_tags))
+
+def _remove_tags(db: Session, condition, old_tags: List[str]):
+    """Drop tags from the selected transactions, in one UPDATE on PostgreSQL."""
+    if db.bind.dialect.name == "postgresql":
+        elements = func.jsonb_array_elements_text(Transaction.tags).table_valued("value")
+        db.execute(
+            update(Transaction)
+            # Only rewrite rows that carry at least one of the tags
+            .where(and_(condition, Transaction.tags.op("?|")(literal(old_tags, ARRAY(Text)))))
+            .values(tags=select(func.jsonb_agg(elements.c.value)).where(elements.c.value.notin_(old_tags)).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        return
+    
+    for transaction in db.query(Transaction).filter(condition):
+        if transaction.tags and set(transaction.tags) & set(old_tags):
+            transaction.tags = [tag for tag in transaction.tags if tag not in old_tags] or None
+
+def _require_tags(data: Optional[dict]) -> List[str]:
+    if not data or "tags" not in data:
+        raise HTTPException(status_code=400, detail="Tags are required")
+    tags = data["tags"]
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise HTTPException(status_code=400, detail="Tags must be a list of strings")
+    return tags
+
 @router.post("/transactions/bulk", response_model=dict)
 def bulk_transaction_operations(
     operation: BulkTransactionOperation,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Perform bulk operations on multiple transactions."""
-    # Verify all transactions belong to the current user
-    transactions = db.query(Transaction).filter(
-        and_(
-            Transaction.id.in_(operation.transaction_ids),
-            Transaction.user_id == current_user.id
-        )
-    ).all()
+    """
+    Perform bulk operations on multiple transactions.
+
+    Each operation is a single set-based UPDATE or DELETE. Ownership is checked by
+    counting the user's matching rows, in the same grouped query that provides
+    the rollup adjustments.
+    """
+    transaction_ids = set(operation.transaction_ids)
+    selected = and_(
+        id_in(db, Transaction.id, transaction_ids),
+        Transaction.user_id == current_user.id
+    )
     
-    if len(transactions) != len(operation.transaction_ids):
+    # Verify all transactions belong to the current user
+    groups = group_totals(db, current_user.id, selected)
+    count = sum(group.transaction_count for group in groups)
+    if count != len(transaction_ids):
         raise HTTPException(
             status_code=403, 
             detail="Some transactions not found or don't belong to you"
         )
     
     if operation.operation == "delete":
-        for transaction in transactions:
-            db.delete(transaction)
+        spend_deltas = {}
+        add_spend_rows(spend_deltas, spend_totals(db, selected), sign=-1)
+        db.execute(delete(Transaction).where(selected).execution_options(synchronize_session=False))
+        record_deletions(db, current_user.id, "transaction", transaction_ids)
+        rollup_deltas = {}
+        for group in groups:
+            add_group_delta(
+                rollup_deltas, group.month, group.type, group.category,
+                -group.total_amount, -group.transaction_count
+            )
+        apply_rollup_deltas(db, current_user.id, rollup_deltas)
+        apply_spend_deltas(db, current_user.id, spend_deltas)
+        bump_data_version(db, current_user.id)
         db.commit()
-        return {"message": f"Deleted {len(transactions)} transactions"}
+        return {"message": f"Deleted {count} transactions"}
     
     elif operation.operation == "update_category":
         if not operation.data or "category" not in operation.data:
             raise HTTPException(status_code=400, detail="Category is required")
+        category = operation.data["category"]
+        
+        # Income and expense categories of the same name are different categories
+        ids_by_type = {
+            type_: id_ for (_, type_), id_ in
+            category_ids(db, current_user.id, [(category, "income"), (category, "expense")]).items()
+        }
+        # Move the expenses' spend to the budgets of the new category
+        moved = spend_totals(db, selected)
+        spend_deltas = {}
+        add_spend_rows(spend_deltas, moved, sign=-1)
+        add_spend_rows(
+            spend_deltas,
+            [(date, ids_by_type.get("expense"), amount, n) for date, _, amount, n in moved]
+        )
+        db.execute(
+            update(Transaction)
+            .where(selected)
+            .values(
+                category=category,
+                category_id=case(ids_by_type, value=Transaction.type) if ids_by_type else None
+            )
+            .execution_options(synchronize_session=False)
+        )
+        # Move each group's totals to the new category
+        rollup_deltas = {}
+        for group in groups:
+            add_group_delta(
+                rollup_deltas, group.month, group.type, group.category,
+                -group.total_amount, -group.transaction_count
+            )
+            add_group_delta(
+                rollup_deltas, group.month, group.type, category,
+                group.total_amount, group.transaction_count
+            )
+        apply_rollup_deltas(db, current_user.id, rollup_deltas)
+        apply_spend_deltas(db, current_user.id, spend_deltas)
+        bump_data_version(db, current_user.id)
+        db.commit()
+        return {"message": f"Updated category for {count} transactions"}
+    
+    elif operation.operation == "update_payment_method":
+        if not operation.data or "payment_method" not in operation.data:
+            raise HTTPException(status_code=400, detail="Payment method is required")
         
-        for transaction in transactions:
-            transaction.category = operation.data["category"]
+        db.execute(
+            update(Transaction)
+            .where(selected)
+            .values(payment_method=operation.data["payment_method"])
+            .execution_options(synchronize_session=False)
+        )
+        bump_data_version(db, current_user.id)
         db.commit()
-        return {"message": f"Updated category for {len(transactions)} transactions"}
+        return {"message": f"Updated payment method for {count} transactions"}
     
     elif operation.operation == "add_tags":
-        if not operation.data or "tags" not in operation.data:
-            raise HTTPException(status_code=400, detail="Tags are required")
-        
-        new_tags = operation.data["tags"]
-        for transaction in transactions:
-            existing_tags = json.loads(transaction.tags) if transaction.tags else []
-            # Add new tags without duplicates
-            combined_tags = list(set(existing_tags + new_tags))
-            transaction.tags = json.dumps(combined_tags)
+        tags = _require_tags(operation.data)
+        _add_tags(db, selected, tags)
+        bump_data_version(db, current_user.id)
         db.commit()
-        return {"message": f"Added tags to {len(transactions)} transactions"}
+        return {"message": f"Added tags to {count} transactions"}
+    
+    elif operation.operation == "remove_tags":
+        tags = _require_tags(operation.data)
+        _remove_tags(db, selected, tags)
+        bump_data_version(db, current_user.id)
+        db.commit()
+        return {"message": f"Removed tags from {count} transactions"}
     
     else:
         raise HTTPException(status_code=400, detail="Invalid operation")
 
+# Rows validated and written per bulk INSERT while importing
+IMPORT_CHUNK_SIZE = 1000
+
+def _parse_import_row(row: dict, user_id: int, currency: str) -> dict:
+    """Build transaction column values from one CSV row; raises ValueError on bad input."""
+    transaction_data = {
+        'user_id': user_id,
+        'amount': float(row.get('amount', 0)),
+        'type': row.get('type', 'expense').lower(),
+        'category': row.get('category', 'Other'),
+        'description': row.get('description', ''),
+        'date': datetime.strptime(row.get('date', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d'),
+        'payment_method': row.get('payment_method'),
+        'location': row.get('location'),
+        'tags': row.get('tags', '').split(',') if row.get('tags') else None
+    }
+
+    # Validate transaction type
+    if transaction_data['type'] not in ['income', 'expense']:
+        raise ValueError(f"Invalid type: {transaction_data['type']}")
+
+    transaction_data['original_amount'] = transaction_data['amount']
+    transaction_data['original_currency'] = currency
+    return transaction_data
+
 @router.post("/transactions/import/csv")
 async def import_transactions_csv(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Import transactions from a CSV file."""
+    """
+    Import transactions from a CSV file.
+
+    The upload is parsed incrementally and written in chunks of IMPORT_CHUNK_SIZE
+    rows with bulk INSERTs; everything is committed together at the end. A chunk
+    that fails to write is reported row by row in `errors` and the rest are kept.
+    """
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
     
-    content = await file.read()
-    decoded = content.decode('utf-8')
-    
-    csv_reader = csv.DictReader(io.StringIO(decoded))
+    # Decode the spooled upload as it is read instead of loading it whole
+    csv_reader = csv.DictReader(io.TextIOWrapper(file.file, encoding='utf-8', newline=''))
     
     imported_count = 0
     errors = []
+    rollup_deltas = {}
+    spend_deltas = {}
     
-    for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 to account for header
+    async def flush(chunk, row_nums):
+        """Write one chunk; on failure report its rows as errors and keep the other chunks."""
         try:
-            # Parse the CSV row
-            transaction_data = {
-                'user_id': current_user.id,
-                'amount': float(row.get('amount', 0)),
-                'type': row.get('type', 'expense').lower(),
-                'category': row.get('category', 'Other'),
-                'description': row.get('description', ''),
-                'date': datetime.strptime(row.get('date', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d'),
-                'payment_method': row.get('payment_method'),
-                'location': row.get('location'),
-                'tags': json.dumps(row.get('tags', '').split(',')) if row.get('tags') else None
-            }
-            
-            # Validate transaction type
-            if transaction_data['type'] not in ['income', 'expense']:
-                raise ValueError(f"Invalid type: {transaction_data['type']}")
-            
-            # Add exchange rate for the transaction
-            transaction_data['original_amount'] = transaction_data['amount']
-            transaction_data['original_currency'] = current_user.currency
-            
-            # Get historical exchange rate
-            if current_user.currency != "USD":
-                transaction_data['exchange_rate_to_usd'] = await get_historical_exchange_rate(
-                    current_user.currency,
-                    "USD",
-                    transaction_data['date']
-                )
-            else:
-                transaction_data['exchange_rate_to_usd'] = 1.0
-            
-            # Create transaction
-            db_transaction = Transaction(**transaction_data)
-            db.add(db_transaction)
-            imported_count += 1
-            
+            # One lookup for all distinct dates and one for all categories in the chunk
+            rates_by_date = await get_historical_exchange_rates(
+                current_user.currency, "USD", (t['date'] for t in chunk)
+            )
+            # A savepoint, so a failed chunk does not abort the rows already written
+            with db.begin_nested():
+                ids_by_category = category_ids(db, current_user.id, ((t['category'], t['type']) for t in chunk))
+                for t in chunk:
+                    t['exchange_rate_to_usd'] = rates_by_date[t['date'].date()]
+                    t['category_id'] = ids_by_category.get((t['category'], t['type']))
+                db.execute(insert(Transaction), chunk)
         except Exception as e:
-            errors.append(f"Row {row_num}: {str(e)}")
+            errors.extend(f"Row {row_num}: {str(e)}" for row_num in row_nums)
+            return 0
+        
+        for t in chunk:
+            add_delta(rollup_deltas, t['date'], t['type'], t['category'], t['amount'])
+            add_spend_delta(spend_deltas, t['date'], t['type'], t['category_id'], t['amount'])
+        return len(chunk)
+    
+    chunk = []
+    row_nums = []
+    try:
+        for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 to account for header
+            try:
+                chunk.append(_parse_import_row(row, current_user.id, current_user.currency))
+                row_nums.append(row_num)
+            except Exception as e:
+                errors.append(f"Row {row_num}: {str(e)}")
+                continue
+            
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                imported_count += await flush(chunk, row_nums)
+                chunk = []
+                row_nums = []
+        
+        if chunk:
+            imported_count += await flush(chunk, row_nums)
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded")
     
     if imported_count > 0:
+        apply_rollup_deltas(db, current_user.id, rollup_deltas)
+        apply_spend_deltas(db, current_user.id, spend_deltas)
+        bump_data_version(db, current_user.id)
         db.commit()
     
     return {
@@ -575,76 +1217,83 @@ async def import_transactions_csv(
         "message": f"Successfully imported {imported_count} transactions"
     }
 
+EXPORT_HEADER = [
+    'Date', 'Type', 'Category', 'Amount', 'Description',
+    'Payment Method', 'Location', 'Tags'
+]
+# Rows fetched per server-side cursor batch and written per response chunk
+EXPORT_BATCH_SIZE = 1000
+
+def _export_csv_chunks(user_id: int, start_date: Optional[datetime], end_date: Optional[datetime]):
+    """
+    Yield the CSV export as encoded chunks of EXPORT_BATCH_SIZE rows.
+
+    Runs in its own session because the response body is produced after the
+    endpoint (and its request-scoped session) has returned.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        chunk = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+        return chunk
+
+    writer.writerow(EXPORT_HEADER)
+    yield flush()
+
+    query = select(
+        Transaction.date,
+        Transaction.type,
+        Transaction.category,
+        Transaction.amount,
+        Transaction.description,
+        Transaction.payment_method,
+        Transaction.location,
+        Transaction.tags
+    ).where(Transaction.user_id == user_id)
+    if start_date:
+        query = query.where(Transaction.date >= start_date)
+    if end_date:
+        query = query.where(Transaction.date <= end_date)
+    query = query.order_by(Transaction.date.desc(), Transaction.id.desc())
+
+    db = SessionLocal()
+    try:
+        # yield_per streams through a server-side cursor instead of buffering every row
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for rows in result.partitions():
+            writer.writerows(
+                [
+                    t.date.strftime('%Y-%m-%d'),
+                    t.type,
+                    t.category,
+                    t.amount,
+                    t.description or '',
+                    t.payment_method or '',
+                    t.location or '',
+                    ','.join(t.tags) if t.tags else ''
+                ]
+                for t in rows
+            )
+            yield flush()
+    finally:
+        db.close()
+
 @router.get("/transactions/export/csv")
 def export_transactions_csv(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Export transactions to CSV format."""
+    """Export transactions to CSV format, streamed in batches."""
     from fastapi.responses import StreamingResponse
     
-    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
-    
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
-    
-    transactions = query.order_by(Transaction.date.desc()).all()
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'Date', 'Type', 'Category', 'Amount', 'Description', 
-        'Payment Method', 'Location', 'Tags'
-    ])
-    
-    # Write transactions
-    for t in transactions:
-        tags = ','.join(json.loads(t.tags)) if t.tags else ''
-        writer.writerow([
-            t.date.strftime('%Y-%m-%d'),
-            t.type,
-            t.category,
-            t.amount,
-            t.description or '',
-            t.payment_method or '',
-            t.location or '',
-            tags
-        ])
-    
-    # Reset file pointer
-    output.seek(0)
-    
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode('utf-8')),
+        _export_csv_chunks(current_user.id, start_date, end_date),
         media_type='text/csv',
         headers={
             'Content-Disposition': f'attachment; filename=transactions_{datetime.now().strftime("%Y%m%d")}.csv'
         }
     )
-
-@router.get("/transactions/recurring", response_model=List[TransactionResponse])
-def get_recurring_transactions(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get all recurring transactions for the current user."""
-    transactions = db.query(Transaction).filter(
-        and_(
-            Transaction.user_id == current_user.id,
-            Transaction.is_recurring == True
-        )
-    ).order_by(Transaction.date.desc()).all()
-    
-    # Convert tags back to list
-    for transaction in transactions:
-        if transaction.tags:
-            transaction.tags = json.loads(transaction.tags)
-    
-    return transactions
\ No newline at end of file
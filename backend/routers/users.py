@@ -9,6 +9,9 @@ from models import SessionLocal, User, UserResponse, UserUpdate
 from auth import get_password_hash, get_current_user
 from storage.factory import get_storage_service
 from storage.base import StorageService
+from etag_utils import bump_data_version
+from rollups import refresh_rollups
+from budget_spend import refresh_user_budget_spend
 
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8060")
@@ -74,6 +77,12 @@ async def update_user(user_update: UserUpdate, current_user: User = Depends(get_
                         new_currency,
                         rates
                     )
+                
+                # Amounts changed, so recompute the user's monthly rollups and budget spend
+                db.flush()
+                refresh_rollups(db, [user.id])
+                refresh_user_budget_spend(db, [user.id])
+                bump_data_version(db, user.id)
     
     db.commit()
     db.refresh(user)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Fill in category_id on existing transactions.
+
+Each transaction is linked to the user's category with the same name and type.
+Rows are processed in id ranges of --batch-size, each in its own short
+transaction, so no lock is held for long and an interrupted run can simply be
+started again: rows that already have a category_id are skipped. Transactions
+whose category name matches no category keep a NULL category_id; they are
+linked when such a category is created.
+
+Usage: python scripts/backfill_category_ids.py [--batch-size N] [--pause SECONDS]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import and_, func
+
+from models import SessionLocal, Transaction
+from category_utils import link_category_ids
+from etag_utils import bump_data_versions
+from budget_spend import refresh_user_budget_spend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--batch-size", type=int, default=5000, help="Transaction ids per batch (default: 5000)")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches (default: 0)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    linked = 0
+    users = set()
+    try:
+        first_id, last_id = db.query(func.min(Transaction.id), func.max(Transaction.id)).one()
+        db.rollback()
+        if first_id is None:
+            print("No transactions to backfill")
+            return 0
+
+        for start in range(first_id, last_id + 1, args.batch_size):
+            batch_users = link_category_ids(
+                db,
+                and_(Transaction.id >= start, Transaction.id < start + args.batch_size)
+            )
+            # Newly linked transactions count toward category budgets
+            refresh_user_budget_spend(db, sorted(set(batch_users)))
+            bump_data_versions(db, batch_users)
+            db.commit()
+
+            linked += len(batch_users)
+            users.update(batch_users)
+            if args.pause:
+                time.sleep(args.pause)
+
+        unlinked = db.query(func.count(Transaction.id)).filter(Transaction.category_id.is_(None)).scalar()
+        print(f"Linked {linked} transactions for {len(users)} users; {unlinked} have no matching category")
+    except Exception as e:
+        print(f"Error while backfilling category ids: {e}")
+        db.rollback()
+        return 1
+    finally:
+        db.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-row cost of transaction list responses.
+
+Seeds a throwaway user with transactions and compares, for each page size, the
+previous path (ORM instances validated through List[TransactionResponse]) with
+the column-row path used by the list endpoints (serializers.transaction_dicts
+rendered by FastJSONResponse). Both bodies are checked to decode to the same
+JSON, and the seeded data is removed afterwards.
+
+Usage: python scripts/benchmark_serialization.py [--page-sizes 100,1000] [--repeat 5]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+from models import SessionLocal, Transaction, TransactionResponse, User
+from serializers import FastJSONResponse, TRANSACTION_COLUMNS, orjson, transaction_dicts
+
+CATEGORIES = ["Food & Dining", "Transportation", "Shopping", "Bills & Utilities", "Salary"]
+
+
+def seed(db, user_id, size):
+    """Insert `size` random transactions for the benchmark user."""
+    rng = random.Random(size)
+    now = datetime.utcnow()
+    db.execute(insert(Transaction), [
+        {
+            "user_id": user_id,
+            "amount": round(rng.uniform(1, 5000), 2),
+            "type": rng.choice(["income", "expense"]),
+            "category": rng.choice(CATEGORIES),
+            "description": f"Transaction {i}",
+            "payment_method": rng.choice(["cash", "credit_card", None]),
+            "tags": rng.choice([None, ["work"], ["travel", "family"]]),
+            "date": now - timedelta(minutes=rng.randint(0, 500000)),
+        }
+        for i in range(size)
+    ])
+    db.commit()
+
+
+def best_of(repeat, fn):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--page-sizes", default="100,1000", help="Comma-separated page sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per path (best is reported)")
+    args = parser.parse_args()
+    page_sizes = [int(size) for size in args.page_sizes.split(",")]
+
+    db = SessionLocal()
+    user = User(
+        name="Serialization benchmark",
+        email=f"benchmark-{uuid.uuid4().hex}@example.com",
+        hashed_password="!",
+    )
+    db.add(user)
+    db.commit()
+    adapter = TypeAdapter(List[TransactionResponse])
+
+    ok = True
+    try:
+        seed(db, user.id, max(page_sizes))
+        query = db.query(Transaction).filter(Transaction.user_id == user.id).order_by(
+            Transaction.date.desc(), Transaction.id.desc()
+        )
+
+        print(f"JSON encoder: {'orjson' if orjson is not None else 'json'}")
+        print(f"{'rows':>6} {'path':>8} {'fetch µs/row':>13} {'serialize µs/row':>17} {'total µs/row':>13}")
+        for size in page_sizes:
+            def legacy_fetch():
+                db.expunge_all()
+                return query.limit(size).all()
+
+            def legacy_serialize(transactions):
+                validated = adapter.validate_python(transactions, from_attributes=True)
+                return JSONResponse(adapter.dump_python(validated, mode="json")).body
+
+            def fast_fetch():
+                return query.with_entities(*TRANSACTION_COLUMNS).limit(size).all()
+
+            def fast_serialize(rows):
+                return FastJSONResponse(transaction_dicts(rows)).body
+
+            legacy_fetch_time, transactions = best_of(args.repeat, legacy_fetch)
+            legacy_time, legacy_body = best_of(args.repeat, lambda: legacy_serialize(transactions))
+            fast_fetch_time, rows = best_of(args.repeat, fast_fetch)
+            fast_time, fast_body = best_of(args.repeat, lambda: fast_serialize(rows))
+
+            match = json.loads(legacy_body) == json.loads(fast_body)
+            ok = ok and match
+            for name, fetch_time, serialize_time in (
+                ("legacy", legacy_fetch_time, legacy_time),
+                ("fast", fast_fetch_time, fast_time),
+            ):
+                print(
+                    f"{size:>6} {name:>8} {fetch_time / size * 1e6:>13.1f} "
+                    f"{serialize_time / size * 1e6:>17.1f} {(fetch_time + serialize_time) / size * 1e6:>13.1f}"
+                )
+            print(f"{'':>6} {'match':>8} {'yes' if match else 'NO'}")
+    finally:
+        db.rollback()
+        db.query(Transaction).filter(Transaction.user_id == user.id).delete(synchronize_session=False)
+        db.query(User).filter(User.id == user.id).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    sys.exit(main())
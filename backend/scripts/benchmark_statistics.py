@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Benchmark /transactions/statistics against the previous in-Python implementation.
+
+Seeds a throwaway user with N synthetic transactions for each requested size,
+times both implementations (the unbounded range is answered from the monthly
+rollups), checks that they return the same payload and
+removes the seeded data afterwards.
+
+Usage: python scripts/benchmark_statistics.py [--sizes 10000,100000,1000000] [--repeat 3]
+"""
+import argparse
+import math
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import insert
+
+from models import SessionLocal, Transaction, TransactionRollup, TransactionStatistics, User
+from rollups import refresh_rollups
+from routers.transactions import get_transaction_statistics
+
+CATEGORIES = {
+    "expense": ["Food & Dining", "Transportation", "Shopping", "Bills & Utilities", "Other"],
+    "income": ["Salary", "Freelance", "Investments"],
+}
+INSERT_BATCH_SIZE = 10000
+
+
+def legacy_statistics(db, user):
+    """The previous implementation: load every row and aggregate in Python."""
+    transactions = db.query(Transaction).filter(Transaction.user_id == user.id).all()
+
+    if not transactions:
+        return TransactionStatistics(
+            total_income=0, total_expenses=0, balance=0, transaction_count=0,
+            average_transaction=0, expenses_by_category={}, income_by_category={},
+            daily_average=0, monthly_trend=[]
+        )
+
+    total_income = sum(t.amount for t in transactions if t.type == "income")
+    total_expenses = sum(t.amount for t in transactions if t.type == "expense")
+
+    expense_transactions = [t for t in transactions if t.type == "expense"]
+    income_transactions = [t for t in transactions if t.type == "income"]
+    largest_expense = max(expense_transactions, key=lambda t: t.amount) if expense_transactions else None
+    largest_income = max(income_transactions, key=lambda t: t.amount) if income_transactions else None
+
+    expenses_by_category = {}
+    income_by_category = {}
+    for t in transactions:
+        if t.type == "expense":
+            expenses_by_category[t.category] = expenses_by_category.get(t.category, 0) + t.amount
+        else:
+            income_by_category[t.category] = income_by_category.get(t.category, 0) + t.amount
+
+    date_range = (max(t.date for t in transactions) - min(t.date for t in transactions)).days + 1
+    daily_average = (total_income - total_expenses) / date_range if date_range > 0 else 0
+
+    monthly_data = {}
+    for t in transactions:
+        month_key = t.date.strftime("%Y-%m")
+        if month_key not in monthly_data:
+            monthly_data[month_key] = {"income": 0, "expenses": 0}
+        if t.type == "income":
+            monthly_data[month_key]["income"] += t.amount
+        else:
+            monthly_data[month_key]["expenses"] += t.amount
+
+    monthly_trend = [
+        {"month": month, "income": data["income"], "expenses": data["expenses"],
+         "balance": data["income"] - data["expenses"]}
+        for month, data in sorted(monthly_data.items())
+    ]
+
+    return TransactionStatistics(
+        total_income=total_income,
+        total_expenses=total_expenses,
+        balance=total_income - total_expenses,
+        transaction_count=len(transactions),
+        average_transaction=(total_income + total_expenses) / len(transactions),
+        largest_expense=largest_expense,
+        largest_income=largest_income,
+        expenses_by_category=expenses_by_category,
+        income_by_category=income_by_category,
+        daily_average=daily_average,
+        monthly_trend=monthly_trend
+    )
+
+
+def seed(db, user_id, size):
+    """Insert `size` random transactions spread over the last five years."""
+    rng = random.Random(size)
+    now = datetime.utcnow()
+    remaining = size
+    while remaining > 0:
+        rows = []
+        for _ in range(min(INSERT_BATCH_SIZE, remaining)):
+            type_ = "income" if rng.random() < 0.2 else "expense"
+            rows.append({
+                "user_id": user_id,
+                "amount": round(rng.uniform(1, 5000), 2),
+                "type": type_,
+                "category": rng.choice(CATEGORIES[type_]),
+                "date": now - timedelta(days=rng.randint(0, 5 * 365), minutes=rng.randint(0, 1439)),
+            })
+        db.execute(insert(Transaction), rows)
+        remaining -= len(rows)
+    refresh_rollups(db, [user_id])
+    db.commit()
+
+
+def same_payload(a, b):
+    """Compare two statistics payloads, allowing for floating-point summation order."""
+    def close(x, y):
+        if isinstance(x, float) or isinstance(y, float):
+            return math.isclose(x, y, rel_tol=1e-9, abs_tol=1e-6)
+        if isinstance(x, dict) and isinstance(y, dict):
+            return x.keys() == y.keys() and all(close(x[k], y[k]) for k in x)
+        if isinstance(x, list) and isinstance(y, list):
+            return len(x) == len(y) and all(close(i, j) for i, j in zip(x, y))
+        return x == y
+
+    a, b = a.model_dump(), b.model_dump()
+    # Ties for the largest row may resolve to different rows; compare the amounts
+    for key in ("largest_expense", "largest_income"):
+        a[key] = a[key] and a[key]["amount"]
+        b[key] = b[key] and b[key]["amount"]
+    return close(a, b)
+
+
+def best_of(repeat, fn):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated row counts")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation (best is reported)")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    db = SessionLocal()
+    user = User(
+        name="Statistics benchmark",
+        email=f"benchmark-{uuid.uuid4().hex}@example.com",
+        hashed_password="!",
+    )
+    db.add(user)
+    db.commit()
+
+    ok = True
+    try:
+        print(f"{'rows':>10} {'legacy (s)':>12} {'sql (s)':>10} {'speedup':>8}  match")
+        for size in sizes:
+            seed(db, user.id, size)
+            legacy_time, legacy = best_of(args.repeat, lambda: legacy_statistics(db, user))
+            db.expunge_all()
+            sql_time, current = best_of(
+                args.repeat,
+                lambda: get_transaction_statistics(start_date=None, end_date=None, db=db, current_user=user)
+            )
+            match = same_payload(legacy, current)
+            ok = ok and match
+            print(f"{size:>10} {legacy_time:>12.3f} {sql_time:>10.3f} {legacy_time / sql_time:>7.1f}x  {'yes' if match else 'NO'}")
+
+            db.query(Transaction).filter(Transaction.user_id == user.id).delete(synchronize_session=False)
+            db.query(TransactionRollup).filter(TransactionRollup.user_id == user.id).delete(synchronize_session=False)
+            db.commit()
+    finally:
+        db.rollback()
+        db.query(Transaction).filter(Transaction.user_id == user.id).delete(synchronize_session=False)
+        db.query(TransactionRollup).filter(TransactionRollup.user_id == user.id).delete(synchronize_session=False)
+        db.query(User).filter(User.id == user.id).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Record budget threshold crossings for all users.
+
+Users are processed a chunk at a time. For each chunk, one INSERT ... SELECT
+over the budget_spend ledger opens (or refreshes) an alert for every active
+budget at or over its alert_threshold, and one UPDATE resolves alerts whose
+budget has dropped back under it. Alerts are unique per budget, window and
+threshold, so re-running never duplicates them. Each chunk commits on its own
+and memory stays flat however many budgets exist. Budgets without a spend
+ledger row get one first.
+
+Writes that change a budget's spend, amount, threshold or active flag
+re-evaluate its alerts themselves, so this is only needed once after the
+budget_alerts migration and afterwards as a periodic reconciliation, e.g.
+nightly from cron.
+
+Usage: python scripts/evaluate_budget_alerts.py [--user-id ID] [--batch-size N]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import SessionLocal
+from budget_alerts import evaluate_budget_alerts
+from budget_spend import fill_missing_spend
+from scripts.rebuild_rollups import user_id_batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--user-id", type=int, help="Only evaluate this user")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Users per transaction (default: 1000)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    users = 0
+    opened = 0
+    resolved = 0
+    try:
+        for ids in user_id_batches(db, args.batch_size, args.user_id):
+            fill_missing_spend(db, ids)
+            chunk_opened, chunk_resolved = evaluate_budget_alerts(db, ids)
+            db.commit()
+            # Nothing from this chunk needs to stay in the identity map
+            db.expunge_all()
+            users += len(ids)
+            opened += chunk_opened
+            resolved += chunk_resolved
+
+        print(f"Evaluated budgets of {users} users: {opened} alerts opened or updated, {resolved} resolved")
+    except Exception as e:
+        print(f"Error while evaluating budget alerts: {e}")
+        db.rollback()
+        return 1
+    finally:
+        db.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    sys.exit(main())
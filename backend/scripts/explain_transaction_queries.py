@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Check that the transaction router queries are served by the hot-path indexes.
+
+Runs EXPLAIN on each query the routers issue and fails if the plan does not
+use the expected index. Sequential scans are disabled for the session so the
+check does not depend on table size, but run it against ANALYZEd data so the
+planner has statistics to choose between the composite indexes.
+
+Usage: python scripts/explain_transaction_queries.py [--user-id ID]
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import and_, func, tuple_
+
+from models import SessionLocal, Transaction, User
+from recurring import due_templates_query
+from routers.transactions import _apply_transaction_filters, _apply_sorting
+
+
+def collect_plan_nodes(plan, nodes):
+    """Flatten an EXPLAIN (FORMAT JSON) plan tree into (node type, index name) pairs."""
+    nodes.append((plan.get("Node Type"), plan.get("Index Name")))
+    for child in plan.get("Plans", []):
+        collect_plan_nodes(child, nodes)
+    return nodes
+
+
+def explain(db, query):
+    statement = getattr(query, "statement", query)
+    compiled = statement.compile(dialect=db.bind.dialect)
+    result = db.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compiled),
+        compiled.params
+    ).scalar()
+    plan = json.loads(result) if isinstance(result, str) else result
+    return collect_plan_nodes(plan[0]["Plan"], [])
+
+
+def build_queries(db, user_id):
+    """(description, query, accepted index names) for every hot router query."""
+    now = datetime.utcnow()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month_end = month_start + timedelta(days=31)
+
+    def listing(sort_by="date", **filters):
+        query = db.query(Transaction).filter(Transaction.user_id == user_id)
+        query = _apply_transaction_filters(query, **filters)
+        return _apply_sorting(query, sort_by, "desc").limit(100)
+
+    def budget_sum(category_id=None):
+        query = db.query(func.sum(Transaction.amount)).filter(
+            and_(
+                Transaction.user_id == user_id,
+                Transaction.type == 'expense',
+                Transaction.date >= month_start,
+                Transaction.date <= month_end
+            )
+        )
+        if category_id:
+            query = query.filter(Transaction.category_id == category_id)
+        return query
+
+    date_indexes = {"ix_transactions_user_id_date"}
+    return [
+        ("list by date", listing("date"), date_indexes),
+        ("list by amount", listing("amount"), {"ix_transactions_user_id_amount"}),
+        ("list by created_at", listing("created_at"), {"ix_transactions_user_id_created_at"}),
+        ("list by date range", listing("date", start_date=month_start, end_date=month_end), date_indexes),
+        ("filter by type", listing("date", type="expense"),
+         date_indexes | {"ix_transactions_user_id_type_date"}),
+        ("filter by category", listing("date", category="Food & Dining"),
+         date_indexes | {"ix_transactions_user_id_category_type_date"}),
+        ("filter by payment method", listing("date", payment_method="cash"),
+         date_indexes | {"ix_transactions_user_id_payment_method_date"}),
+        ("budget usage", budget_sum(), {"ix_transactions_user_id_type_date"}),
+        ("budget usage by category", budget_sum(1),
+         {"ix_transactions_user_id_category_id_type_date"}),
+        ("sync changes", db.query(Transaction).filter(
+            and_(
+                Transaction.user_id == user_id,
+                tuple_(Transaction.sync_seq, Transaction.id) > tuple_(0, 0)
+            )
+        ).order_by(Transaction.sync_seq, Transaction.id).limit(501), {"ix_transactions_user_id_sync_seq"}),
+        ("recurring", db.query(Transaction).filter(
+            and_(Transaction.user_id == user_id, Transaction.is_recurring == True)
+        ).order_by(Transaction.date.desc()), {"ix_transactions_user_id_recurring"}),
+        ("recurring due", due_templates_query("monthly", now, 0),
+         {"ix_transactions_recurring_due"}),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--user-id", type=int, help="User to plan queries for (default: first user)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if db.bind.dialect.name != "postgresql":
+            print("EXPLAIN checks require PostgreSQL")
+            return 1
+
+        user_id = args.user_id or db.query(func.min(User.id)).scalar() or 1
+        db.execute(func.set_config("enable_seqscan", "off", True).select())
+
+        queries = build_queries(db, user_id)
+        failures = 0
+        for description, query, accepted in queries:
+            nodes = explain(db, query)
+            used = {index for _, index in nodes if index}
+            node_types = ", ".join(node for node, index in nodes if index)
+            if used & accepted:
+                print(f"  ✓ {description}: {', '.join(sorted(used))} ({node_types})")
+            else:
+                failures += 1
+                print(f"  ✗ {description}: expected one of {sorted(accepted)}, plan uses {sorted(used) or 'no index'}")
+
+        print(f"\n{len(queries) - failures} passed, {failures} failed")
+        return 1 if failures else 0
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    sys.exit(main())
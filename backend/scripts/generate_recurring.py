@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Materialize due occurrences of recurring transactions for all users.
+
+Templates (is_recurring transactions) are read a batch at a time in
+(frequency, id) order, so each template is visited at most once per run and
+memory stays flat however many templates exist; templates further behind than
+one run's cap catch up over later runs. Each batch
+inserts its occurrences, advances the templates' watermarks and updates the
+rollups in one transaction, so runs are incremental and an interrupted run
+resumes where it stopped. Run it from cron, e.g. hourly.
+
+Usage: python scripts/generate_recurring.py [--batch-size N] [--until ISO_DATETIME]
+"""
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import SessionLocal
+from etag_utils import bump_data_versions
+from recurring import FREQUENCY_STEPS, due_templates, initialize_watermarks, materialize_occurrences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--batch-size", type=int, default=1000, help="Templates per transaction (default: 1000)")
+    parser.add_argument(
+        "--until",
+        type=datetime.fromisoformat,
+        help="Materialize occurrences up to this UTC time instead of now"
+    )
+    args = parser.parse_args()
+    now = args.until or datetime.utcnow()
+
+    db = SessionLocal()
+    scanned = 0
+    created = 0
+    users = set()
+    try:
+        initialized = initialize_watermarks(db)
+        db.commit()
+        if initialized:
+            print(f"Initialized watermarks for {initialized} new templates")
+
+        for frequency in FREQUENCY_STEPS:
+            position = None
+            while True:
+                templates = due_templates(db, frequency, now, position, args.batch_size)
+                if not templates:
+                    break
+                batch_created, batch_users = materialize_occurrences(db, templates, now)
+                bump_data_versions(db, batch_users)
+                db.commit()
+
+                scanned += len(templates)
+                created += batch_created
+                users.update(batch_users)
+                position = templates[-1].id
+
+        print(f"Scanned {scanned} templates: created {created} occurrences for {len(users)} users")
+    except Exception as e:
+        print(f"Error while generating recurring transactions: {e}")
+        db.rollback()
+        return 1
+    finally:
+        db.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    sys.exit(main())
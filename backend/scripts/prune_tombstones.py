@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Delete sync tombstones older than the retention period.
+
+Clients whose sync cursor is older than the retention period are told to run a
+full sync, so their tombstones are no longer needed. Rows are deleted in
+batches to keep each transaction short.
+
+Usage: python scripts/prune_tombstones.py [--days N] [--batch-size N]
+"""
+import argparse
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import delete, select
+
+from models import SessionLocal, DeletedRecord
+from sql_utils import db_now
+from sync_utils import SYNC_TOMBSTONE_RETENTION_DAYS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--days", type=int, default=SYNC_TOMBSTONE_RETENTION_DAYS,
+                        help=f"Keep tombstones this many days (default: {SYNC_TOMBSTONE_RETENTION_DAYS})")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows deleted per transaction")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    deleted = 0
+    try:
+        cutoff = db_now(db) - timedelta(days=args.days)
+        while True:
+            ids = select(DeletedRecord.id).where(DeletedRecord.deleted_at < cutoff).limit(args.batch_size)
+            result = db.execute(delete(DeletedRecord).where(DeletedRecord.id.in_(ids)))
+            db.commit()
+            deleted += result.rowcount
+            if result.rowcount < args.batch_size:
+                break
+        print(f"Deleted {deleted} tombstones older than {cutoff:%Y-%m-%d %H:%M}")
+    except Exception as e:
+        print(f"Error while pruning tombstones: {e}")
+        db.rollback()
+        return 1
+    finally:
+        db.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Rebuild or verify the monthly transaction rollups.
+
+Recomputes transaction_rollups from raw transactions, a chunk of users at a
+time. With --verify nothing is written; every (user, month, type, category)
+whose stored totals differ from the raw rows is reported instead.
+
+Usage: python scripts/rebuild_rollups.py [--verify] [--user-id ID] [--batch-size N]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import SessionLocal, User
+from rollups import find_rollup_drift, refresh_rollups
+
+
+def user_id_batches(db, batch_size, user_id=None):
+    """Yield lists of user ids in ascending order, batch_size at a time."""
+    if user_id is not None:
+        yield [user_id]
+        return
+
+    last_id = 0
+    while True:
+        ids = [
+            row.id for row in db.query(User.id)
+            .filter(User.id > last_id)
+            .order_by(User.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--verify", action="store_true", help="Report drift without rewriting rollups")
+    parser.add_argument("--user-id", type=int, help="Only process this user")
+    parser.add_argument("--batch-size", type=int, default=500, help="Users per transaction (default: 500)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    users = 0
+    drifted = 0
+    try:
+        for ids in user_id_batches(db, args.batch_size, args.user_id):
+            if args.verify:
+                for drift in find_rollup_drift(db, ids):
+                    drifted += 1
+                    print(
+                        f"  ⚠ user {drift['user_id']} {drift['month']} {drift['type']} {drift['category']!r}: "
+                        f"stored {drift['stored_amount']:.2f} ({drift['stored_count']} rows), "
+                        f"expected {drift['expected_amount']:.2f} ({drift['expected_count']} rows)"
+                    )
+                db.rollback()
+            else:
+                refresh_rollups(db, ids)
+                db.commit()
+            users += len(ids)
+
+        if args.verify:
+            print(f"\nChecked {users} users: {drifted} drifted rollup rows")
+        else:
+            print(f"Rebuilt rollups for {users} users")
+    except Exception as e:
+        print(f"Error while processing rollups: {e}")
+        db.rollback()
+        return 2
+    finally:
+        db.close()
+
+    return 1 if drifted else 0
+
+
+if __name__ == "__main__":
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    sys.exit(main())
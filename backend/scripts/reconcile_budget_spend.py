@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Rebuild or verify the budget_spend ledger.
+
+Recomputes every budget's spend from raw transactions, a chunk of users at a
+time, which also fills in budgets that have no ledger row yet (e.g. right after
+the ledger was introduced). With --verify nothing is written; every budget
+whose stored spend differs from the raw rows is reported instead.
+
+Usage: python scripts/reconcile_budget_spend.py [--verify] [--user-id ID] [--batch-size N]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import SessionLocal
+from budget_spend import find_spend_drift, refresh_user_budget_spend
+from scripts.rebuild_rollups import user_id_batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--verify", action="store_true", help="Report drift without rewriting the ledger")
+    parser.add_argument("--user-id", type=int, help="Only process this user")
+    parser.add_argument("--batch-size", type=int, default=500, help="Users per transaction (default: 500)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    users = 0
+    drifted = 0
+    try:
+        for ids in user_id_batches(db, args.batch_size, args.user_id):
+            if args.verify:
+                for drift in find_spend_drift(db, ids):
+                    drifted += 1
+                    state = "missing" if drift["missing"] else (
+                        f"stored {drift['stored_amount']:.2f} ({drift['stored_count']} rows)"
+                    )
+                    print(
+                        f"  ⚠ user {drift['user_id']} budget {drift['budget_id']}: {state}, "
+                        f"expected {drift['expected_amount']:.2f} ({drift['expected_count']} rows)"
+                    )
+                db.rollback()
+            else:
+                refresh_user_budget_spend(db, ids)
+                db.commit()
+            users += len(ids)
+
+        if args.verify:
+            print(f"\nChecked {users} users: {drifted} drifted budgets")
+        else:
+            print(f"Rebuilt budget spend for {users} users")
+    except Exception as e:
+        print(f"Error while reconciling budget spend: {e}")
+        db.rollback()
+        return 2
+    finally:
+        db.close()
+
+    return 1 if drifted else 0
+
+
+if __name__ == "__main__":
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    sys.exit(main())
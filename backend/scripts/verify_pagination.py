@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Check that cursor pagination visits every transaction exactly once.
+
+Walks a user's transactions page by page with the cursors the list endpoints
+hand out, for every sort column in both directions, and compares the ids seen
+with the full ordered listing. A cursor that skips rows or repeats a page
+(e.g. datetime columns compared in mismatched forms) fails the check.
+
+Usage: python scripts/verify_pagination.py [--user-id ID] [--page-size N]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func
+
+from models import SessionLocal, Transaction, User
+from routers.transactions import _apply_sorting, _next_cursor
+
+SORT_COLUMNS = ("date", "created_at", "amount")
+
+
+def walk(db, user_id, sort_by, sort_order, page_size, max_pages):
+    """Ids of every page in order, following next cursors; stops after max_pages."""
+    seen = []
+    cursor = None
+    for _ in range(max_pages):
+        query = db.query(Transaction).filter(Transaction.user_id == user_id)
+        rows = _apply_sorting(query, sort_by, sort_order, cursor).limit(page_size + 1).all()
+        seen.extend(row.id for row in rows[:page_size])
+        cursor = _next_cursor(rows, page_size, sort_by, sort_order)
+        if not cursor:
+            break
+    return seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--user-id", type=int, help="User to paginate (default: first user)")
+    parser.add_argument("--page-size", type=int, default=10, help="Rows per page (default: 10)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user_id = args.user_id or db.query(func.min(User.id)).scalar() or 1
+        total = db.query(Transaction).filter(Transaction.user_id == user_id).count()
+        # One page more than needed, so a cursor that repeats a page is caught
+        max_pages = total // args.page_size + 2
+
+        failures = 0
+        for sort_by in SORT_COLUMNS:
+            for sort_order in ("asc", "desc"):
+                query = db.query(Transaction.id).filter(Transaction.user_id == user_id)
+                expected = [row.id for row in _apply_sorting(query, sort_by, sort_order)]
+                seen = walk(db, user_id, sort_by, sort_order, args.page_size, max_pages)
+                description = f"{sort_by} {sort_order}"
+                if seen == expected:
+                    print(f"  ✓ {description}: {len(seen)} rows")
+                else:
+                    failures += 1
+                    print(
+                        f"  ✗ {description}: {len(seen)} rows seen ({len(set(seen))} distinct), "
+                        f"expected {len(expected)}"
+                    )
+
+        print(f"\n{2 * len(SORT_COLUMNS) - failures} passed, {failures} failed")
+        return 1 if failures else 0
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    sys.exit(main())
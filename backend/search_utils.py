@@ -0,0 +1,49 @@
+from typing import List
+
+from sqlalchemy import and_, cast, func, or_, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from models import Transaction
+
+# Columns covered by the trigram GIN indexes (see migration 2f9c41d7e8a3)
+SEARCH_COLUMNS = (Transaction.description, Transaction.location, Transaction.category)
+
+
+def search_condition(q: str):
+    """
+    Substring match of `q` against description, location and category.
+    On PostgreSQL the pg_trgm GIN indexes serve these ILIKE '%q%' predicates
+    (for queries of three characters or more); elsewhere they scan the user's rows.
+    """
+    pattern = f"%{q}%"
+    return or_(*(column.ilike(pattern) for column in SEARCH_COLUMNS))
+
+
+def search_relevance(db: Session, q: str):
+    """
+    Relevance score for ordering search results, best match first.
+    Uses pg_trgm word similarity on PostgreSQL; returns None on other databases,
+    where callers fall back to ordering by date.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return None
+    return func.greatest(
+        *(func.word_similarity(q, func.coalesce(column, "")) for column in SEARCH_COLUMNS)
+    )
+
+
+def tags_condition(db: Session, tag_list: List[str]):
+    """
+    Transactions carrying every tag in `tag_list`.
+    On PostgreSQL this is a single JSONB containment (@>) served by the GIN index.
+    """
+    if db.bind.dialect.name == "postgresql":
+        return Transaction.tags.op("@>")(cast(tag_list, JSONB))
+    # Elsewhere the array is stored as text with non-ASCII characters escaped,
+    # so compare the decoded elements rather than the raw text
+    conditions = []
+    for tag in tag_list:
+        elements = func.json_each(Transaction.tags).table_valued("value")
+        conditions.append(select(elements.c.value).where(elements.c.value == tag).exists())
+    return and_(*conditions)
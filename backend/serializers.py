@@ -0,0 +1,52 @@
+import json
+from typing import Any, Iterable, List
+
+from fastapi import Response
+from sqlalchemy import DateTime
+
+try:
+    import orjson
+except ImportError:
+    # Fallback for environments installed before orjson was a dependency
+    orjson = None
+
+from models import Transaction, TransactionResponse
+
+# TransactionResponse fields that are plain transaction columns, in schema order
+TRANSACTION_FIELDS = [
+    name for name in TransactionResponse.model_fields if name in Transaction.__table__.c
+]
+TRANSACTION_COLUMNS = [getattr(Transaction, name) for name in TRANSACTION_FIELDS]
+_DATETIME_FIELDS = [
+    name for name in TRANSACTION_FIELDS if isinstance(Transaction.__table__.c[name].type, DateTime)
+]
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response for payloads that are already plain dicts and lists.
+    Rendered with orjson when available; nothing is validated on the way out.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def transaction_dicts(rows: Iterable) -> List[dict]:
+    """
+    TransactionResponse-shaped dicts built straight from rows selected with
+    TRANSACTION_COLUMNS, skipping ORM instances and per-row model validation.
+    """
+    items = []
+    for row in rows:
+        item = dict(zip(TRANSACTION_FIELDS, row))
+        for name in _DATETIME_FIELDS:
+            value = item[name]
+            if value is not None:
+                item[name] = value.isoformat()
+        item["category_details"] = None
+        items.append(item)
+    return items
@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import DateTime, Integer, any_, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+
+def is_postgresql(db: Session) -> bool:
+    """Whether the session is bound to PostgreSQL (as opposed to e.g. a SQLite test database)."""
+    return db.bind.dialect.name == "postgresql"
+
+
+def month_key(db: Session, column):
+    """'YYYY-MM' label for the month of a datetime column, computed in SQL."""
+    if is_postgresql(db):
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+
+def id_in(db: Session, column, ids: Iterable[int]):
+    """
+    `column IN (ids)`. On PostgreSQL this is `column = ANY(:ids)` with a single
+    array parameter, so the statement does not grow with the number of ids.
+    """
+    ids = list(ids)
+    if is_postgresql(db):
+        return column == any_(literal(ids, ARRAY(Integer)))
+    return column.in_(ids)
+
+
+def db_now(db: Session) -> datetime:
+    """
+    The database's current timestamp, comparable with the naive DateTime columns
+    it fills through server_default/onupdate now().
+    """
+    if is_postgresql(db):
+        return db.scalar(select(func.localtimestamp()))
+    return db.scalar(select(func.now()))
+
+
+def timestamp_key(db: Session, value):
+    """
+    A DateTime column or value in a form that compares reliably in SQL.
+    SQLite stores now() defaults as 'YYYY-MM-DD HH:MM:SS' but bound datetimes with
+    microseconds, so both sides are normalised with datetime() there.
+    """
+    if isinstance(value, datetime):
+        value = literal(value, DateTime)
+    if is_postgresql(db):
+        return value
+    return func.datetime(value)
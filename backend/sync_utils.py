@@ -0,0 +1,71 @@
+import base64
+import json
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import Budget, Category, DeletedRecord, Transaction, User
+from sql_utils import id_in
+
+# How long tombstones are kept; older sync cursors must start a full sync
+SYNC_TOMBSTONE_RETENTION_DAYS = 90
+
+# Tables /sync reads by sync_seq
+SYNCED_MODELS = [Transaction, Category, Budget, DeletedRecord]
+
+# entity -> (sync_seq, id) of the last row handed to the client
+SyncPositions = Dict[str, Tuple[int, int]]
+
+
+def record_deletions(db: Session, user_id: int, entity: str, ids: Iterable[int]):
+    """Write tombstones for deleted rows in the caller's transaction, so /sync can report them."""
+    rows = [{"user_id": user_id, "entity": entity, "entity_id": entity_id} for entity_id in ids]
+    if rows:
+        db.execute(insert(DeletedRecord), rows)
+
+
+def stamp_sync_seq(db: Session, user_ids: List[int]):
+    """
+    Stamp the users' rows written in this transaction (sync_seq still NULL) with
+    their current data_version. Called by bump_data_version, after the version
+    is advanced: the users row stays locked until commit, so versions are
+    stamped in commit order and a cursor never skips a row committed after it.
+    """
+    for model in SYNCED_MODELS:
+        values = {"sync_seq": select(User.data_version).where(User.id == model.user_id).scalar_subquery()}
+        if hasattr(model, "updated_at"):
+            # Stamping is not itself a change
+            values["updated_at"] = model.updated_at
+        db.execute(
+            update(model)
+            .where(and_(id_in(db, model.user_id, user_ids), model.sync_seq.is_(None)))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def encode_sync_cursor(positions: SyncPositions, issued_at: datetime) -> str:
+    """Opaque cursor for GET /sync holding the position reached in each stream and when it was issued."""
+    payload = {name: [seq, row_id] for name, (seq, row_id) in positions.items()}
+    payload["issued_at"] = issued_at.isoformat()
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def decode_sync_cursor(cursor: Optional[str]) -> Tuple[SyncPositions, Optional[datetime]]:
+    """
+    Decode a cursor from encode_sync_cursor into (positions, issued_at); an empty
+    cursor gives ({}, None). Raises ValueError when it is malformed.
+    """
+    if not cursor:
+        return {}, None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        issued_at = datetime.fromisoformat(payload.pop("issued_at"))
+        return {
+            name: (int(seq), int(row_id))
+            for name, (seq, row_id) in payload.items()
+        }, issued_at
+    except (ValueError, TypeError, AttributeError, KeyError) as e:
+        raise ValueError("Invalid sync cursor") from e